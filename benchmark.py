@@ -0,0 +1,185 @@
+import argparse
+import functools
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+import numpy as np
+import mathematics
+from mathematics import (calculate_expression, calcsum, calcproduct, compile_input, convert, format_input, get_alias,
+                         get_random_primes, plot, plot_func, prime_factorization, scientific, solve_for_x)
+from cache import PersistentCache
+from currency import RateProvider, static_rates
+from encoding import message_to_ascii_hexadecimal, message_to_ascii_decimal
+from utils import float_to_formatted_string
+
+# Rates against the euro returned by the stubbed currency rate source, so that currency conversions can be benchmarked offline
+stub_rates = {'USD': 1.08, 'GBP': 0.86, 'CAD': 1.47, 'AUD': 1.65, 'JPY': 160.0, 'CHF': 0.96}
+
+# Percentiles of the latency per call that are reported
+percentiles = (50, 90, 99)
+
+Case = Tuple[Callable, tuple]
+
+
+def expect_error(function: Callable) -> Callable:
+    '''
+    Wraps an entry point whose call is expected to raise, for the invalid inputs in the worst case corpora.
+    Errors of all other calls are raised, so that they show up as failures instead of fast calls.
+    '''
+    @functools.wraps(function)
+    def call(*args):
+        try:
+            function(*args)
+        except Exception:
+            pass
+    return call
+
+
+def corpora() -> Dict[str, List[Case]]:
+    '''
+    Gets the benchmark corpora per entry point: representative inputs, and worst cases under the /worst suffix.
+    '''
+    x = np.linspace(-10, 10, 10000)
+    long_expression = '+'.join(f'sin({k})*cos({k})^2' for k in range(200))
+    return {
+        'format_input/math': [(format_input, (e, 0)) for e in ['1+1', '2^10-sqrt(2)', 'sin(pi/4)*cos(pi/4)', 'sum(1,10,x^2)', '5!+log(100,10)']],
+        'format_input/graph': [(format_input, (e, 1)) for e in ['x^2', 'sin(x)*x', 'sqrt(abs(x))+floor(x)', '1/x', 'tan(x)mod 2']],
+        'format_input/solve': [(format_input, (e, 2)) for e in ['x^2=4', '2x+1=0', 'sin(x)=1/2', 'x^3-x=0', 'e^x=2']],
+        'format_input/worst': [(format_input, (long_expression, style)) for style in (0, 1)] + [(format_input, ('(' * 100 + 'x' + ')' * 100, 1))],
+        'calculate_expression': [(calculate_expression, (e,)) for e in ['1+1', '2^10-sqrt(2)', 'sin(pi/4)*cos(pi/4)', '5!+log(100,10)', 'e^(i*pi)']],
+        'calculate_expression/worst': [(calculate_expression, (e,)) for e in [long_expression, '1000!', '1000000!', 'pi']] + [(calculate_expression, ('pi', 1000)), (expect_error(calculate_expression), ('sqrt(-1',))],
+        'calcsum': [(calcsum, (1, n, f)) for n, f in [(100, 'x^2'), (1000, '1/x'), (10**5, 'x^3'), (10**6, 'sin(x)')]],
+        'calcsum/worst': [(calcsum, (1, 10**6, 'x^i')), (calcsum, (1, math.inf, '1/x^2')), (calcsum, (1, math.inf, '(-1)^x/x'))],
+        'calcproduct': [(calcproduct, (1, n, f)) for n, f in [(100, 'x'), (1000, '1+1/x^2'), (10**5, '1+1/x^2')]],
+        'calcproduct/worst': [(calcproduct, (1, 10**4, 'x')), (calcproduct, (1, 10**6, 'x')), (calcproduct, (1, math.inf, '1+1/x^2'))],
+        'plot': [(plot, ('-10', '10', f, 1000, 750)) for f in ['sin(x)', 'x^2', 'tan(x)', 'sin(x); cos(x)']],
+        'plot/worst': [(plot, ('-10', '10', 'sin(1/x)', 1000, 750)), (plot, ('-10', '10', 'x mod 1', 1000, 750)), (plot, ('0', '100', 'sin(x^2)', 1000, 750, '1000000'))],
+        'plot_func': [(plot_func, (x, compile_input(f, 1))) for f in ['sin(x)', 'x^2+2x+1', 'sqrt(x)', 'log(x)']],
+        'plot_func/worst': [(plot_func, (x, compile_input(long_expression.replace('*', '*x*'), 1)))],
+        'solve_for_x': [(solve_for_x, (format_input(e, 2),)) for e in ['x^2=4', '2x+1=0', 'x^3-x=0']],
+        'solve_for_x/worst': [(solve_for_x, (format_input(e, 2),)) for e in ['sin(x)=1/2', 'x^5-x+1=0', 'x*e^x=2', 'sqrt(x)+x=6', 'cos(x)=x', 'e^x=x+2', 'x^50-3x^7+2=0']],
+        'convert': [(convert, args) for args in [('5', 'km', 'mi'), ('100', 'c', 'f'), ('1', 'h', 's'), ('10', 'usd', 'eur')]],
+        'convert/worst': [(convert, args) for args in [('1', 'light-years', 'millimetres'), ('1', 'kilometres', 'lightyears')]] + [(expect_error(convert), ('1', 'km', 'kg'))],
+        'get_alias': [(get_alias, (unit,)) for unit in ['km', 'miles', 'usd', 'fahrenheit']],
+        'scientific': [(scientific, (value,)) for value in ['12345', '1.5e10', '0.000123', '6.022 • 10^23']],
+        'scientific/worst': [(scientific, ('1' * 300,)), (scientific, ('1e308',)), (expect_error(scientific), ('abc',))],
+        'float_to_formatted_string': [(float_to_formatted_string, (value,)) for value in [1.5, 1234567.891, 1e-10, 3.14159]],
+        'get_random_primes': [(get_random_primes, ('1', '.txt', digits)) for digits in ['5', '10', '20']],
+        'get_random_primes/worst': [(get_random_primes, ('1', '.txt', '300'))],
+        'prime_factorization': [(prime_factorization, (n,)) for n in ['360', '1234567', '9999999967']],
+        'prime_factorization/worst': [(prime_factorization, (n,)) for n in [str(2**61 - 1), str((2**31 - 1) * (2**61 - 1)), str(10**30 + 57)]],
+        'encoding': [(f, (message,)) for f in (message_to_ascii_hexadecimal, message_to_ascii_decimal) for message in ['Hello', 'The quick brown fox']],
+        'encoding/worst': [(f, ('x' * 10000,)) for f in (message_to_ascii_hexadecimal, message_to_ascii_decimal)],
+    }
+
+@contextmanager
+def isolated_caches() -> Iterator[None]:
+    '''
+    Replaces the persistent solution cache by an empty one in memory, so that the benchmark neither reads nor clears the store on disk.
+    '''
+    solution_cache = mathematics.solution_cache
+    mathematics.solution_cache = PersistentCache(':memory:', 'benchmark', maxsize=512)
+    try:
+        yield
+    finally:
+        mathematics.solution_cache = solution_cache
+
+def run_case(case: Case, cold: bool):
+    function, args = case
+    if cold:
+        mathematics.expression_cache.clear()
+        mathematics.range_cache.clear()
+        mathematics.solution_cache.clear()
+        mathematics.get_alias.cache_clear()
+        mathematics.constant_value.cache_clear()
+    function(*args)
+
+def run_benchmark(cases: List[Case], repeat: int, cold: bool = True) -> dict:
+    '''
+    Runs each case repeat times after a warm-up call, and reports the latency percentiles in milliseconds,
+    the throughput in calls per second, and the peak memory of a single pass over the cases in KiB.
+    Cold runs clear the caches before every call, so that they measure the uncached path instead of cache hits.
+    '''
+    with isolated_caches():
+        for case in cases:
+            run_case(case, cold)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for case in cases:
+                call_start = time.perf_counter()
+                run_case(case, cold)
+                latencies.append(time.perf_counter() - call_start)
+        total = time.perf_counter() - start
+
+        tracemalloc.start()
+        for case in cases:
+            run_case(case, cold)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies = np.array(latencies) * 1000
+        result = {f'p{p}': float(np.percentile(latencies, p)) for p in percentiles}
+        result['mean'] = float(latencies.mean())
+        result['throughput'] = len(latencies) / total
+        result['peak_kib'] = peak / 1024
+        return result
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    '''
+    Gets the regressions of the results against the baseline:
+    median latency or peak memory that grew by more than the threshold (e.g. 0.2 for 20%).
+    '''
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ('p50', 'peak_kib'):
+            before, after = baseline[name][metric], result[metric]
+            if before > 0 and (after - before) / before > threshold:
+                regressions.append(f'{name}: {metric} {before:.3f} -> {after:.3f} (+{(after - before) / before:.0%})')
+    return regressions
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Benchmark the entry points of the math engine.')
+    parser.add_argument('-k', '--filter', default='', help='only run benchmarks whose name contains this text')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of timed passes over each corpus (default: 5)')
+    parser.add_argument('--warm', action='store_true', help='keep the expression, plot and solution caches between calls, measuring cache hits (default: clear them before every call)')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='compare the results with a saved JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative regression that fails the comparison (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    mathematics.currency_rates = RateProvider(static_rates(stub_rates), snapshot_path=None)
+    cold = not args.warm
+
+    results = {}
+    print(f'{"benchmark":<28}' + ''.join(f'{f"p{p} ms":>11}' for p in percentiles) + f'{"calls/s":>11}{"peak KiB":>11}')
+    for name, cases in corpora().items():
+        if args.filter not in name:
+            continue
+        result = run_benchmark(cases, args.repeat, cold)
+        results[name] = result
+        print(f'{name:<28}' + ''.join(f'{result[f"p{p}"]:>11.3f}' for p in percentiles) + f'{result["throughput"]:>11.1f}{result["peak_kib"]:>11.1f}')
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'cold': cold, 'results': results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline.get('cold', False) != cold:
+            sys.exit(f'The baseline was measured {"cold" if baseline.get("cold", False) else "warm"}, run the benchmark the same way to compare.')
+        regressions = compare(results, baseline['results'], args.threshold)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Union
+import os
+import sqlite3
+import threading
+import time
+
+
+class LRUCache:
+    '''
+    Least recently used cache with a configurable maximum size and hit/miss counters.
+    '''
+    def __init__(self, maxsize: int = 256):
+        self._data = OrderedDict()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int):
+        if maxsize < 0:
+            raise ValueError(f'Invalid cache size: {maxsize}.')
+        self._maxsize = maxsize
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        '''
+        Gets the value for the given key, marking it as most recently used.
+        '''
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key: Hashable, value: Any):
+        '''
+        Stores the value for the given key, evicting the least recently used entries if the cache is full.
+        '''
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._evict()
+
+    def clear(self):
+        '''
+        Removes all entries and resets the hit/miss counters.
+        '''
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> dict:
+        '''
+        Gets the cache statistics.
+        '''
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self._maxsize}
+
+    def _evict(self):
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+
+class PersistentCache:
+    '''
+    Cache of string values with an in-memory LRU cache in front of a persistent SQLite store, so that entries survive restarts.
+    The store is opened on first use, so that every process opens its own connection.
+    Entries of another version (e.g. written with another version of a dependency) are removed when the store is opened.
+    The version may be given as a function, so that e.g. the dependency is only imported when the store is opened.
+    When the values in the store exceed max_bytes, the least recently used entries are evicted.
+    If the store cannot be opened, only the in-memory cache is used.
+    '''
+    def __init__(self, path: str, version: Union[str, Callable[[], str]], maxsize: int = 256, max_bytes: int = 64 * 2**20):
+        self.path = path
+        self.version = version
+        self.max_bytes = max_bytes
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk_hits = 0
+        self._connection = None
+        self._opened = False
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        '''
+        Gets the value for the given key from memory, or from the store, or None if it is in neither.
+        '''
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None or not self._open():
+                return value
+            try:
+                row = self._connection.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                self._connection.execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+                self._connection.commit()
+            except sqlite3.Error:
+                return None
+            self.disk_hits += 1
+            self.memory.put(key, row[0])
+            return row[0]
+
+    def put(self, key: str, value: str):
+        '''
+        Stores the value for the given key in memory and in the store, evicting old entries from the store if it is full.
+        '''
+        with self._lock:
+            self.memory.put(key, value)
+            if not self._open():
+                return
+            try:
+                self._connection.execute('INSERT OR REPLACE INTO entries (key, value, size, used) VALUES (?, ?, ?, ?)',
+                                         (key, value, len(value.encode('utf-8')), time.time()))
+                self._evict()
+                self._connection.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        '''
+        Removes all entries from memory and from the store.
+        '''
+        with self._lock:
+            self.memory.clear()
+            self.disk_hits = 0
+            if self._open():
+                try:
+                    self._connection.execute('DELETE FROM entries')
+                    self._connection.commit()
+                except sqlite3.Error:
+                    pass
+
+    def info(self) -> dict:
+        '''
+        Gets the cache statistics, including the number of entries and bytes in the store.
+        '''
+        with self._lock:
+            info = self.memory.info()
+            info['disk_hits'] = self.disk_hits
+            if self._open():
+                try:
+                    info['disk_size'], info['disk_bytes'] = self._connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+                except sqlite3.Error:
+                    pass
+            return info
+
+    def _open(self) -> bool:
+        if not self._opened:
+            self._opened = True
+            try:
+                version = self.version() if callable(self.version) else self.version
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                connection.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, size INTEGER, used REAL)')
+                connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+                row = connection.execute('SELECT value FROM meta WHERE name = \'version\'').fetchone()
+                if row is None or row[0] != version:
+                    connection.execute('DELETE FROM entries')
+                    connection.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (\'version\', ?)', (version,))
+                connection.commit()
+                self._connection = connection
+            except (sqlite3.Error, OSError):
+                self._connection = None
+        return self._connection is not None
+
+    def _evict(self):
+        total = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._connection.execute('SELECT key, size FROM entries ORDER BY used').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
@@ -0,0 +1,116 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
+from mathematics import calculate_expression, solve, convert, scientific, prime_factorization
+
+modes = ['calculate', 'solve', 'convert', 'scientific', 'factor']
+formats = ['jsonl', 'csv']
+fields = ['line', 'mode', 'input', 'result', 'error']
+
+# Number of input lines sent to a worker process at once
+chunk_size = 256
+
+
+def evaluate_line(number: int, line: str, mode: str = 'calculate', precision: int = None) -> dict:
+    '''
+    Evaluates a single input line, which may override the mode with a prefix, e.g. 'solve: x^2 = 4'.
+    Conversions are given as 'value unit new_unit', optionally with 'to' before the new unit.
+    '''
+    prefix, separator, rest = line.partition(':')
+    if separator and prefix.strip().lower() in modes:
+        mode, line = prefix.strip().lower(), rest
+    line = line.strip()
+    record = {'line': number, 'mode': mode, 'input': line, 'result': None, 'error': None}
+    try:
+        match mode:
+            case 'calculate':
+                result = calculate_expression(line, precision)
+            case 'solve':
+                result = solve(line)
+            case 'convert':
+                args = line.split()
+                if len(args) == 4 and args[2].lower() == 'to':
+                    del args[2]
+                if len(args) > 3:
+                    raise ValueError(f'Invalid conversion: {line}. Please give a value, unit and new unit.')
+                result = convert(*args)
+            case 'scientific':
+                result = scientific(line)
+            case 'factor':
+                result = prime_factorization(line)
+        record['result'] = result.strip()
+    except Exception as e:
+        record['error'] = str(e).replace('\n', ' ').strip()
+    return record
+
+def evaluate_chunk(chunk: List[Tuple[int, str]], mode: str, precision: int) -> List[dict]:
+    return [evaluate_line(number, line, mode, precision) for number, line in chunk]
+
+def read_lines(file: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    '''
+    Gets the numbered input lines, skipping empty lines and comments starting with #.
+    '''
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield number, line
+
+def evaluate_lines(lines: Iterator[Tuple[int, str]], mode: str = 'calculate', precision: int = None, jobs: int = 1) -> Iterator[dict]:
+    '''
+    Evaluates the numbered input lines in order, using a pool of jobs processes if jobs > 1.
+    Only a limited number of chunks is in flight at once, so that input is streamed instead of read up front.
+    '''
+    if jobs <= 1:
+        for number, line in lines:
+            yield evaluate_line(number, line, mode, precision)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        while (chunk := list(itertools.islice(lines, chunk_size))):
+            pending.append(executor.submit(evaluate_chunk, chunk, mode, precision))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def write_records(records: Iterator[dict], output, format: str = 'jsonl'):
+    '''
+    Writes the result records as JSON lines or CSV, flushing each line so that results are streamed.
+    '''
+    if format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=fields, lineterminator='\n')
+        writer.writeheader()
+    for record in records:
+        if format == 'csv':
+            writer.writerow(record)
+        else:
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Evaluate expressions, equations, conversions or factorizations line by line, without the GUI.')
+    parser.add_argument('input', nargs='?', default='-', help='input file with one problem per line (default: stdin)')
+    parser.add_argument('-m', '--mode', choices=modes, default='calculate', help='default mode of lines without a mode prefix such as "solve:"')
+    parser.add_argument('-f', '--format', choices=formats, default='jsonl', help='output format (default: jsonl)')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes (default: 1)')
+    parser.add_argument('-p', '--precision', type=int, default=None, help='number of significant digits for calculations (default: standard floating point)')
+    args = parser.parse_args(argv)
+
+    input = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        write_records(evaluate_lines(read_lines(input), args.mode, args.precision, args.jobs), output, args.format)
+    finally:
+        if input is not sys.stdin:
+            input.close()
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+from typing import Callable, Dict, NamedTuple, Optional
+import json
+import os
+import threading
+import time
+from lazy import lazy_import
+
+converter = lazy_import('forex_python.converter')
+
+# Currency that the rate table is fetched for, from which the rates between all other currencies are derived
+base_currency = 'EUR'
+# Time in seconds for which a fetched rate table is used before it is fetched again
+rate_ttl = 3600
+# Time in seconds after a failed fetch before the rates are fetched again, while the last table is used
+retry_interval = 60
+# File with the last fetched rate table, which is used at startup and when the rates cannot be fetched
+snapshot_path = 'output/cache/currency_rates.json'
+
+RateSource = Callable[[str], Dict[str, float]]
+
+
+class CurrencyRate(NamedTuple):
+    '''
+    Conversion factor between two currencies in the unit table, which is looked up when a value is converted.
+    '''
+    input: str
+    output: str
+
+
+def forex_rates(base: str) -> Dict[str, float]:
+    '''
+    Fetches the rates of all currencies against the base currency with forex_python.
+    '''
+    return converter.CurrencyRates().get_rates(base)
+
+def static_rates(rates: Dict[str, float]) -> RateSource:
+    '''
+    Gets a rate source that returns fixed rates against the base currency without the network, e.g. for tests and benchmarks.
+    '''
+    return lambda base: dict(rates)
+
+
+class RateProvider:
+    '''
+    Provides the rates between currencies from a single table of rates against the base currency.
+    The table is fetched from the source at most once per ttl seconds, and saved as a snapshot if snapshot_path is given.
+    At startup a snapshot that is younger than the ttl is used without fetching, and if fetching fails,
+    the last table (or the snapshot, however old) is used instead until the next attempt after retry_interval seconds.
+    '''
+    def __init__(self, source: RateSource = forex_rates, ttl: float = rate_ttl, snapshot_path: Optional[str] = snapshot_path, base: str = base_currency):
+        self.source = source
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.base = base
+        self.table: Optional[Dict[str, float]] = None
+        self.time = 0.0
+        self.next_fetch = 0.0
+        self.lock = threading.Lock()
+
+    def rate(self, input: str, output: str) -> float:
+        '''
+        Gets the rate from currency input to currency output.
+        '''
+        table = self.rates()
+        if input not in table or output not in table:
+            raise ValueError(f'No currency rate available from {input} to {output}.')
+        return table[output] / table[input]
+
+    def rates(self) -> Dict[str, float]:
+        '''
+        Gets the rates of all currencies against the base currency, fetching them if the table is older than the ttl.
+        '''
+        with self.lock:
+            if self.table is None:
+                self.load_snapshot()
+            if self.table is None or time.time() >= self.next_fetch:
+                self.fetch()
+            if self.table is None:
+                raise ValueError('Currency rates are not available. Please check your internet connection.')
+            return self.table
+
+    def fetch(self):
+        try:
+            rates = {currency: float(rate) for currency, rate in self.source(self.base).items()}
+        except Exception:
+            self.next_fetch = time.time() + retry_interval # keep the last table, if any
+            return
+        rates[self.base] = 1.0
+        self.table, self.time = rates, time.time()
+        self.next_fetch = self.time + self.ttl
+        self.save_snapshot()
+
+    def load_snapshot(self):
+        if not self.snapshot_path:
+            return
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as file:
+                snapshot = json.load(file)
+            if snapshot['base'] == self.base:
+                self.table, self.time = snapshot['rates'], float(snapshot['time'])
+                self.next_fetch = self.time + self.ttl
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+            # Written to a temporary file first, so that other processes never read a partial snapshot
+            temporary_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                json.dump({'base': self.base, 'time': self.time, 'rates': self.table}, file)
+            os.replace(temporary_path, self.snapshot_path)
+        except OSError:
+            pass
+
+    def clear(self):
+        '''
+        Forgets the table in memory, so that the next rate is read from the snapshot or fetched.
+        '''
+        with self.lock:
+            self.table, self.time, self.next_fetch = None, 0.0, 0.0
@@ -0,0 +1,315 @@
+import re
+from typing import List, NamedTuple, Tuple, Union
+
+legal = ['log', 'sqrt', 'floor', 'ceil', 'sin', 'cos', 'tan', 'round', 'abs', 'pi', 'alpha', 'delta', 'theta', 'tau', 'phi', 'gamma', 'lambda', 'psi', 'rho', 'e', 'i', 'inf', 'mod', 'x', 'sum', 'product']
+legal_graph = ['log', 'sqrt', 'floor', 'ceil', 'sin', 'cos', 'tan', 'round', 'abs', 'pi', 'alpha', 'delta', 'theta', 'tau', 'phi', 'gamma', 'lambda', 'psi', 'rho', 'e', 'mod', 'x']
+legal_solve = ['log', 'sqrt', 'sin', 'cos', 'tan', 'pi', 'alpha', 'delta', 'theta', 'tau', 'phi', 'gamma', 'lambda', 'psi', 'rho', 'e', 'x', 'i']
+legal_words = {0: legal, 1: legal_graph, 2: legal_solve, 3: legal}
+
+constants = ['pi', 'alpha', 'delta', 'theta', 'tau', 'phi', 'gamma', 'lambda', 'psi', 'rho', 'e', 'i', 'inf']
+
+functions = ['log', 'sqrt', 'floor', 'ceil', 'sin', 'cos', 'tan', 'round', 'abs', 'sum', 'product']
+
+# Function names per style, as they should appear in the formatted input
+function_names = {
+    0: {
+        'sin': 'cmath.sin', 'cos': 'cmath.cos', 'tan': 'cmath.tan', 'sqrt': 'cmath.sqrt', 'log': 'cmath.log',
+        'floor': 'wrap_fn(\'math.floor\',', 'ceil': 'wrap_fn(\'math.ceil\',', 'round': 'wrap_fn(\'round\',',
+        'sum': 'calcsum', 'product': 'calcproduct'
+    },
+    1: {
+        'sin': 'np.sin', 'cos': 'np.cos', 'tan': 'np.tan', 'sqrt': 'np.sqrt', 'log': 'np.log',
+        'floor': 'np.floor', 'ceil': 'np.ceil', 'round': 'np.round'
+    },
+    2: {},
+    3: {
+        'sin': 'mp.sin', 'cos': 'mp.cos', 'tan': 'mp.tan', 'sqrt': 'mp.sqrt', 'log': 'mp.log',
+        'floor': 'mp.floor', 'ceil': 'mp.ceil', 'round': 'mp.nint',
+        'sum': 'precise_sum', 'product': 'precise_product'
+    }
+}
+
+token_pattern = re.compile(r'\s*(?:(\d+\.?\d*|\.\d+)|([^\W\d]+)|(\*\*|//|[-+*/%^!(),=]))')
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    position: int
+
+class Number(NamedTuple):
+    value: str
+
+class Name(NamedTuple):
+    name: str
+    position: int
+
+class Call(NamedTuple):
+    name: str
+    args: List['Node']
+    position: int
+
+class UnaryOp(NamedTuple):
+    op: str
+    operand: 'Node'
+
+class BinOp(NamedTuple):
+    op: str
+    left: 'Node'
+    right: 'Node'
+
+class Factorial(NamedTuple):
+    operand: 'Node'
+    position: int
+
+class Group(NamedTuple):
+    expr: 'Node'
+
+class Equation(NamedTuple):
+    left: 'Node'
+    right: 'Node'
+
+Node = Union[Number, Name, Call, UnaryOp, BinOp, Factorial, Group, Equation]
+
+
+def tokenize(input: str) -> List[Token]:
+    '''
+    Split the user-input mathematical expression into tokens in a single pass.
+    '''
+    tokens = []
+    index = 0
+    input = input.rstrip()
+    while index < len(input):
+        match = token_pattern.match(input, index)
+        if not match:
+            char = input[index:].lstrip()[0]
+            raise ValueError(f'Illegal argument: {char}')
+        number, word, op = match.groups()
+        if number is not None:
+            tokens.append(Token('number', number, match.start(1)))
+        elif word is not None:
+            if word == 'mod':
+                tokens.append(Token('op', '%', match.start(2)))
+            else:
+                tokens.append(Token('name', word, match.start(2)))
+        else:
+            tokens.append(Token('op', '^' if op == '**' else op, match.start(3)))
+        index = match.end()
+    return tokens
+
+
+class Parser:
+    '''
+    Recursive descent parser for mathematical expressions.
+    Grammar:
+    equation := expr ['=' expr]
+    expr := term (('+' | '-') term)*
+    term := unary (('*' | '/' | '//' | '%') unary | implicit multiplication)*
+    unary := ('+' | '-') unary | power
+    power := postfix ['^' unary]
+    postfix := primary '!'*
+    primary := number | name | name '(' args ')' | '(' expr ')'
+    '''
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self) -> Token:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise ValueError('Unexpected end of expression')
+        self.index += 1
+        return token
+
+    def accept(self, *ops: str) -> Token:
+        token = self.peek()
+        if token and token.kind == 'op' and token.text in ops:
+            self.index += 1
+            return token
+        return None
+
+    def expect(self, op: str) -> Token:
+        token = self.accept(op)
+        if token is None:
+            token = self.peek()
+            if token is None:
+                raise ValueError(f'Missing \'{op}\' at end of expression')
+            raise ValueError(f'Expected \'{op}\' at index {token.position}, found \'{token.text}\'')
+        return token
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ValueError('Empty expression')
+        node = self.expr()
+        if self.accept('='):
+            node = Equation(node, self.expr())
+        token = self.peek()
+        if token is not None:
+            raise ValueError(f'Unexpected \'{token.text}\' at index {token.position}')
+        return node
+
+    def expr(self) -> Node:
+        node = self.term()
+        while (token := self.accept('+', '-')):
+            node = BinOp(token.text, node, self.term())
+        return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        while True:
+            if (token := self.accept('*', '/', '//', '%')):
+                node = BinOp(token.text, node, self.unary())
+            elif self.starts_primary():
+                node = BinOp('*', node, self.power())
+            else:
+                return node
+
+    def starts_primary(self) -> bool:
+        token = self.peek()
+        return token is not None and (token.kind in ('number', 'name') or token.text == '(')
+
+    def unary(self) -> Node:
+        if (token := self.accept('+', '-')):
+            return UnaryOp(token.text, self.unary())
+        return self.power()
+
+    def power(self) -> Node:
+        node = self.postfix()
+        if self.accept('^'):
+            node = BinOp('^', node, self.unary())
+        return node
+
+    def postfix(self) -> Node:
+        node = self.primary()
+        while (token := self.accept('!')):
+            node = Factorial(node, token.position)
+        return node
+
+    def primary(self) -> Node:
+        token = self.next()
+        if token.kind == 'number':
+            return Number(token.text)
+        if token.kind == 'name':
+            if token.text in functions:
+                if not self.accept('('):
+                    raise ValueError(f'Missing parentheses for function {token.text} at index {token.position}')
+                args = [self.expr()]
+                while self.accept(','):
+                    args.append(self.expr())
+                self.expect(')')
+                return Call(token.text, args, token.position)
+            return Name(token.text, token.position)
+        if token.text == '(':
+            node = self.expr()
+            self.expect(')')
+            return Group(node)
+        raise ValueError(f'Unexpected \'{token.text}\' at index {token.position}')
+
+
+def parse(input: str) -> Node:
+    '''
+    Parse the user-input mathematical expression into an abstract syntax tree.
+    '''
+    return Parser(tokenize(input)).parse()
+
+def to_source(node: Node) -> str:
+    '''
+    Convert the syntax tree back into a normalized user-input expression.
+    '''
+    match node:
+        case Number(value):
+            return value
+        case Name(name):
+            return name
+        case Call(name, args):
+            return f'{name}({",".join(to_source(arg) for arg in args)})'
+        case UnaryOp(op, operand):
+            return op + to_source(operand)
+        case BinOp(op, left, right):
+            return f'{to_source(left)}{op}{to_source(right)}'
+        case Factorial(operand):
+            return f'{to_source(operand)}!'
+        case Group(expr):
+            return f'({to_source(expr)})'
+        case Equation(left, right):
+            return f'{to_source(left)}={to_source(right)}'
+
+def emit(node: Node, style: int, term: bool = False, parameters: Tuple[str, ...] = ()) -> str:
+    '''
+    Validate the syntax tree and convert it to a python expression for the given style.
+    Style 0 = math, 1 = graph, 2 = solve, 3 = math in arbitrary precision (mpmath)
+    In styles 0 and 3, x may only be used in the function f(x) of sum and product, unless term is True.
+    Parameters are names that are allowed in addition to the legal words of the style, e.g. a swept parameter.
+    '''
+    return Emitter(style, term, parameters).emit(node)
+
+
+class Emitter:
+    '''
+    Converts a syntax tree to a python expression for a given style.
+    '''
+    def __init__(self, style: int, term: bool = False, parameters: Tuple[str, ...] = ()):
+        self.style = style
+        self.legal = legal_words[style] + list(parameters)
+        self.names = function_names[style]
+        self.x_allowed = term or style not in (0, 3)
+
+    def check(self, name: str):
+        if not name in self.legal:
+            raise ValueError(f'Illegal argument: {name}')
+
+    def emit(self, node: Node) -> str:
+        match node:
+            case Number(value):
+                if self.style == 3:
+                    # Parse numbers at the working precision, so that decimals are exact and integer division is not rounded to a float
+                    return f'mp.mpf({repr(value)})'
+                return value
+            case Name(name, position):
+                self.check(name)
+                if name == 'x' and not self.x_allowed:
+                    raise ValueError(f'Incorrectly formatted function f(x) at index {position}')
+                if self.style == 3 and name in constants:
+                    return f'precise_constant({repr(name)})'
+                return 'lambda_var' if name == 'lambda' else name
+            case Call(name, args, position):
+                self.check(name)
+                if name in ('sum', 'product'):
+                    if len(args) != 3:
+                        raise ValueError(f'Incorrectly formatted function {name} at index {position}: expected {name}(start, end, f(x))')
+                    start, end = self.emit(args[0]), self.emit(args[1])
+                    self.check_term(args[2])
+                    return f'{self.names[name]}({start},{end},{repr(to_source(args[2]))})'
+                fn = self.names.get(name, name)
+                arguments = ','.join(self.emit(arg) for arg in args)
+                return f'{fn}{arguments})' if fn.endswith(',') else f'{fn}({arguments})'
+            case UnaryOp(op, operand):
+                return op + self.emit(operand)
+            case BinOp(op, left, right):
+                if self.style == 3 and op == '//':
+                    return f'mp.floor(({self.emit(left)})/({self.emit(right)}))'
+                return f'{self.emit(left)}{"**" if op == "^" else op}{self.emit(right)}'
+            case Factorial(operand, position):
+                if self.style not in (0, 3):
+                    raise ValueError(f'Illegal argument: ! at index {position}')
+                return f'{"mp." if self.style == 3 else ""}factorial({self.emit(operand)})'
+            case Group(expr):
+                return f'({self.emit(expr)})'
+            case Equation(left, right):
+                if self.style != 2:
+                    raise ValueError('Illegal argument: =')
+                return f'{self.emit(left)}={self.emit(right)}'
+
+    def check_term(self, node: Node):
+        '''
+        Validates the function f(x) of a sum or product, in which x is allowed.
+        '''
+        x_allowed = self.x_allowed
+        self.x_allowed = True
+        try:
+            self.emit(node)
+        finally:
+            self.x_allowed = x_allowed
@@ -0,0 +1,215 @@
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Instrumentation is opt-in through environment variables, so that worker processes inherit the settings:
+# MATHGUI_INSTRUMENT=1 records stages, MATHGUI_INSTRUMENT=memory also records tracemalloc peaks,
+# and MATHGUI_PROFILE=1 dumps a cProfile file of each request to the output folder
+enabled = False
+trace_memory = False
+profile = False
+
+
+class Record(NamedTuple):
+    stage: str
+    seconds: float
+    peak: Optional[int] # peak traced memory in bytes, if memory tracing is enabled
+    depth: int
+
+
+class Stats:
+    '''
+    Cumulative statistics of a stage.
+    '''
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.peak = 0
+
+    def add(self, record: Record):
+        self.calls += 1
+        self.seconds += record.seconds
+        self.max_seconds = max(self.max_seconds, record.seconds)
+        if record.peak is not None:
+            self.peak = max(self.peak, record.peak)
+
+    def to_dict(self) -> dict:
+        return {'calls': self.calls, 'seconds': self.seconds, 'max_seconds': self.max_seconds, 'peak_bytes': self.peak}
+
+
+stats: Dict[str, Stats] = {}
+last_request: List[Record] = []
+lock = threading.Lock()
+local = threading.local()
+
+
+def configure(instrument: bool = False, memory: bool = False, debug: bool = False):
+    '''
+    Enables or disables instrumentation in this process and in worker processes started afterwards.
+    '''
+    global enabled, trace_memory, profile
+    enabled, trace_memory, profile = instrument or memory or debug, memory, debug
+    os.environ['MATHGUI_INSTRUMENT'] = 'memory' if memory else '1' if enabled else ''
+    os.environ['MATHGUI_PROFILE'] = '1' if debug else ''
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def configure_from_environment():
+    global enabled, trace_memory, profile
+    setting = os.environ.get('MATHGUI_INSTRUMENT', '')
+    trace_memory, profile = setting == 'memory', bool(os.environ.get('MATHGUI_PROFILE'))
+    enabled = bool(setting) or profile
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+class Stage:
+    '''
+    Context manager that records the wall time, and optionally the peak memory, of a stage.
+    Stages may be nested. The peak of an outer stage includes the peaks of its inner stages.
+    '''
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.stack = local.__dict__.setdefault('stack', [])
+        self.memory = None
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                self.stack[-1].inner_peak = max(self.stack[-1].inner_peak, peak)
+            tracemalloc.reset_peak()
+            self.memory, self.inner_peak = current, 0
+        self.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        seconds = time.perf_counter() - self.start
+        self.stack.pop()
+        peak = None
+        if self.memory is not None:
+            traced_peak = max(tracemalloc.get_traced_memory()[1], self.inner_peak)
+            peak = traced_peak - self.memory
+            if self.stack:
+                self.stack[-1].inner_peak = max(self.stack[-1].inner_peak, traced_peak)
+        record(Record(self.name, seconds, peak, len(self.stack)))
+
+
+def stage(name: str):
+    '''
+    Gets a context manager that records the named stage if instrumentation is enabled, e.g. with stage('eval'): ...
+    '''
+    return Stage(name) if enabled else nullcontext()
+
+def record(item: Record):
+    with lock:
+        stats.setdefault(item.stage, Stats()).add(item)
+        last_request.append(item)
+
+def merge(records: List[Record]):
+    '''
+    Adds the records of a request that ran in another process, e.g. a worker process, making it the last request.
+    '''
+    start_request()
+    for item in records:
+        record(Record(*item))
+
+
+class Request:
+    '''
+    Context manager around a whole request, which starts a new breakdown in last_request
+    and dumps a cProfile file of the request in debug mode.
+    '''
+    def __init__(self, name: str):
+        self.name = name
+        self.stage = Stage(name)
+        self.profiler = cProfile.Profile() if profile else None
+
+    def __enter__(self):
+        start_request()
+        if self.profiler:
+            self.profiler.enable()
+        return self.stage.__enter__()
+
+    def __exit__(self, *exc):
+        self.stage.__exit__(*exc)
+        if self.profiler:
+            self.profiler.disable()
+            os.makedirs('output/profiles', exist_ok=True)
+            self.profiler.dump_stats(f'output/profiles/{self.name}_{datetime.utcnow().strftime("%Y-%m-%d_%H%M%S%f")}.prof')
+
+
+def request(name: str):
+    '''
+    Gets a context manager that records a whole request if instrumentation is enabled.
+    '''
+    return Request(name) if enabled else nullcontext()
+
+def start_request():
+    with lock:
+        last_request.clear()
+
+def take_request() -> List[Record]:
+    '''
+    Gets the records of the last request, e.g. to send them from a worker process to the main process.
+    '''
+    with lock:
+        return list(last_request)
+
+def summary() -> str:
+    '''
+    Gets a one line breakdown of the last request, e.g. for a status bar.
+    '''
+    records = take_request()
+    inner = ' · '.join(format_record(item) for item in records if item.depth > 0)
+    outer = [item for item in records if item.depth == 0]
+    return f'{inner} | {format_record(outer[-1])}' if inner and outer else inner or ' · '.join(map(format_record, outer))
+
+def format_record(item: Record) -> str:
+    text = f'{item.stage} {item.seconds * 1000:.1f} ms'
+    if item.peak is not None:
+        text += f' ({item.peak / 1024:.0f} KiB)'
+    return text
+
+def export_json() -> str:
+    with lock:
+        return json.dumps({name: item.to_dict() for name, item in stats.items()}, indent=2)
+
+def export_prometheus() -> str:
+    '''
+    Gets the cumulative statistics in the Prometheus text exposition format.
+    '''
+    metrics = [
+        ('mathgui_stage_calls_total', 'counter', 'Number of times each stage ran', 'calls'),
+        ('mathgui_stage_seconds_total', 'counter', 'Total wall time spent in each stage', 'seconds'),
+        ('mathgui_stage_max_seconds', 'gauge', 'Longest wall time of a single run of each stage', 'max_seconds'),
+        ('mathgui_stage_peak_bytes', 'gauge', 'Highest traced memory peak of each stage', 'peak')
+    ]
+    lines = []
+    with lock:
+        for name, type, description, attribute in metrics:
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} {type}']
+            lines += [f'{name}{{stage="{stage}"}} {getattr(item, attribute)}' for stage, item in stats.items()]
+    return '\n'.join(lines) + '\n'
+
+def export_stats(format: str = 'json') -> str:
+    '''
+    Writes the cumulative statistics as JSON or Prometheus text to the output folder and returns the file path.
+    '''
+    extension = '.json' if format == 'json' else '.prom'
+    os.makedirs('output', exist_ok=True)
+    file_name = f'output/stats_{datetime.utcnow().strftime("%Y-%m-%d_%H%M%S%f")}{extension}'
+    with open(file_name, 'w', encoding='utf-8') as file:
+        file.write(export_json() if format == 'json' else export_prometheus())
+    return file_name
+
+
+configure_from_environment()
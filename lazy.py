@@ -0,0 +1,56 @@
+from types import ModuleType
+from typing import Dict
+import importlib
+import threading
+import time
+
+# Lazy modules per module name, so that all importers share the module
+lazy_modules: Dict[str, 'LazyModule'] = {}
+
+
+class LazyModule:
+    '''
+    Stand-in for a module that imports the module on first attribute access.
+    '''
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.RLock()
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self) -> str:
+        return f'<lazy module \'{self._name}\'{" (loaded)" if self._module else ""}>'
+
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> ModuleType:
+        '''
+        Imports the module if it was not imported yet.
+        '''
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+
+def lazy_import(name: str) -> LazyModule:
+    '''
+    Gets a lazy stand-in for the named module, which is imported when one of its attributes is first used.
+    '''
+    return lazy_modules.setdefault(name, LazyModule(name))
+
+def warm_imports(*names: str) -> Dict[str, float]:
+    '''
+    Imports the given lazy modules (all registered lazy modules by default),
+    and returns the time in seconds spent importing each of them.
+    '''
+    times = {}
+    for name in names or list(lazy_modules):
+        start = time.perf_counter()
+        lazy_import(name).load()
+        times[name] = time.perf_counter() - start
+    return times
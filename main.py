@@ -1,19 +1,58 @@
+import time
+start_time = time.perf_counter()
 from functools import partial
 import inspect
+import sys
+import threading
 from tkinter import *
 from tkinter import Image as TkImage
 from tkinter import ttk
 from ttkthemes import ThemedTk
 import ctypes as ct
-from mathematics import calculate_expression, plot, solve, convert, scientific, get_units, get_random_primes, prime_factorization
+from mathematics import calculate_expression, plot, export_plot_samples, solve, convert, scientific, get_units, get_random_primes, prime_factorization
 from enum import Enum
-from PIL import ImageTk, Image
 import webbrowser
-import pyperclip
 from encoding import message_to_ascii_hexadecimal, message_to_ascii_decimal
+from cache import LRUCache
+from workers import WorkerPool
+from lazy import lazy_import, warm_imports
+import instrumentation
+from instrumentation import stage
+
+# Dependencies that are only needed by some modes are imported when first used, or warmed up after the window is shown
+Image = lazy_import('PIL.Image')
+ImageTk = lazy_import('PIL.ImageTk')
+pyperclip = lazy_import('pyperclip')
+plotting = lazy_import('plotting')
 
 Mode = Enum('Mode', 'Calculator Solve Scientific Plot Conversion Primes Factoring ASCII')
 
+# Delay in milliseconds after the last resize event before the plot is redrawn
+resize_delay = 100
+# Delay in milliseconds over which pan and zoom events are combined into a single redraw
+view_delay = 15
+# Factor by which the x-range of a plot shrinks for each step of the mouse wheel
+zoom_factor = 0.8
+# Interval in milliseconds at which results of worker processes are polled
+poll_interval = 50
+# Delay in milliseconds after the window is shown before dependencies are imported in the background
+warm_delay = 200
+# Modules imported in the background by the window and by the worker processes
+window_modules = ('numpy', 'PIL.Image', 'PIL.ImageTk', 'plotting', 'pyperclip')
+worker_modules = ('numpy', 'sympy')
+# Minimum window size per mode in pixels, (1000, 400) for modes that are not listed
+window_sizes = {Mode.Plot: (650, 700)}
+# Attributes of the Application that belong to the frame of the current mode, which are swapped when switching modes
+frame_attributes = (
+    'frame', 'result_field', 'copy_button', 'cancel_button', 'label', 'entry_field',
+    'plot_data', 'plot_formula', 'plot_samples', 'plot_extent', 'drag_start', 'pending_view',
+    'plot_original', 'plot_resized', 'plot_image', 'export_data_button', 'export_button',
+    'min_x_entry_field', 'max_x_entry_field', 'samples_entry_field', 'unit_from_entry_field', 'unit_to_entry_field',
+    'file_types', 'var_file_type', 'number_of_primes_label', 'number_of_primes_field', 'encoding_bases', 'var_encoding_base'
+)
+# Precision options of the calculator, as the number of significant digits (None for standard floating point)
+precision_options = {'Standard precision': None, '50 digits': 50, '100 digits': 100, '1000 digits': 1000}
+
 def create_themed_window(root=False) -> ThemedTk:
     '''
     Creates a themed (equilux) window in dark mode.
@@ -46,6 +85,14 @@ def dark_title_bar(window):
     set_window_attribute(hwnd, rendering_policy, ct.byref(value),
                          ct.sizeof(value))
     
+def report_startup_time(window: ThemedTk):
+    '''
+    Prints the time from the start of the program until the window is drawn and ready for input, and closes the window.
+    '''
+    window.update()
+    print(f'Startup time: {(time.perf_counter() - start_time) * 1000:.0f} ms')
+    window.destroy()
+
 class HelpWindow(Frame):
     def __init__(self, master: ThemedTk, help_text=''):
         super().__init__(master)
@@ -71,7 +118,18 @@ class Application(Frame):
         super().__init__(master)
         self.master = master
         self.frame = None
+        self.frame_states = {}
+        self.resize_job = None
+        self.view_job = None
+        self.render_cache = LRUCache(maxsize=4)
+        self.pool = WorkerPool(initializer=partial(warm_imports, *worker_modules))
+        self.request = None
+        self.poll_job = None
+        self.var_precision = StringVar(value=next(iter(precision_options)))
+        self.status_bar = None
         self.create_menu()
+        if instrumentation.enabled:
+            self.create_status_bar()
 
         # Entry style to highlight selection
         ttk.Style().configure('TEntry', selectbackground='#002c5e')
@@ -102,12 +160,62 @@ class Application(Frame):
         help_menu.add_command(label='GitHub', command=self.open_github_page)
         help_menu.add_command(label='Support (join Discord)', command=self.open_discord)
         menu.add_cascade(label='Help', menu=help_menu)
+
+        if instrumentation.enabled:
+            stats_menu = Menu(menu, background='#464646', foreground='#a6a6a6', tearoff=False)
+            stats_menu.add_command(label='Export statistics (JSON)', command=partial(self.export_stats, 'json'))
+            stats_menu.add_command(label='Export statistics (Prometheus)', command=partial(self.export_stats, 'prometheus'))
+            menu.add_cascade(label='Statistics', menu=stats_menu)
+
+    def create_status_bar(self):
+        '''
+        Creates the status bar below the frame of each mode, which shows the stage breakdown of the last request.
+        '''
+        self.status_bar = ttk.Label(self.master, text='Instrumentation enabled', anchor='w')
+        self.status_bar.grid(row=1, column=0, sticky=E+W)
+
+    def update_status(self):
+        if self.status_bar:
+            self.status_bar['text'] = instrumentation.summary()
+
+    def export_stats(self, format: str):
+        file_name = instrumentation.export_stats(format)
+        if self.status_bar:
+            self.status_bar['text'] = f'Statistics written to {file_name}'
     
     def set_mode(self, mode: Mode):
+        '''
+        Shows the frame of the given mode. Frames are built the first time their mode is visited,
+        and are hidden instead of destroyed when switching modes, so that their input and results are kept.
+        '''
+        for job in (self.resize_job, self.view_job):
+            if job:
+                self.master.after_cancel(job)
+        self.resize_job, self.view_job = None, None
+        if self.request:
+            self.pool.cancel(self.request)
+            self.request = None
+            self.cancel_button['state'] = 'disabled'
+            self.result_field['text'] = '\nCalculation cancelled.\n'
+        if self.frame:
+            self.frame_states[self.mode] = {name: getattr(self, name) for name in frame_attributes}
+            self.frame.grid_remove()
+
         self.mode = mode
         self.master.title(f'Math GUI - {mode.name}')
-        if self.frame:
-            self.frame.destroy()
+        width, height = window_sizes.get(mode, (1000, 400))
+        if self.master.winfo_width() < width or self.master.winfo_height() < height:
+            self.master.geometry(f'{width}x{height}')
+
+        if mode in self.frame_states:
+            for name, value in self.frame_states[mode].items():
+                setattr(self, name, value)
+            self.frame.grid()
+            self.entry_field.focus()
+            return
+        # Attributes that the new mode does not build must not point at the widgets of the previous mode
+        for name in frame_attributes:
+            setattr(self, name, None)
         match self.mode:
             case Mode.Calculator:
                 self.create_calculator_widgets()
@@ -148,6 +256,12 @@ class Application(Frame):
         help_root = create_themed_window()
         HelpWindow(help_root, help_text)
 
+    def warm_up(self):
+        '''
+        Imports the dependencies of the other modes in a background thread, so that switching modes does not stall.
+        '''
+        threading.Thread(target=warm_imports, args=window_modules, daemon=True).start()
+
     def open_github_page(self):
         webbrowser.open('https://github.com/ChattyRS/MathGui')
 
@@ -155,9 +269,6 @@ class Application(Frame):
         webbrowser.open('https://discord.gg/Pcbz2HH')
 
     def create_calculator_widgets(self):
-        if self.master.winfo_width() < 1000 or self.master.winfo_height() < 400:
-            self.master.geometry('1000x400')
-
         self.frame = Frame(self.master)
         self.frame.grid(row=0, column=0, sticky=E+W+N+S)
 
@@ -167,6 +278,9 @@ class Application(Frame):
         self.copy_button = ttk.Button(self.frame, text='Copy', command=self.to_clipboard)
         self.copy_button.grid(row=1, column=1, sticky=E+W+N+S)
 
+        self.cancel_button = ttk.Button(self.frame, text='Cancel', command=self.cancel, state='disabled')
+        self.cancel_button.grid(row=0, column=1, sticky=E+W+S)
+
         match self.mode:
             case Mode.Calculator:
                 self.label = ttk.Label(self.frame, text='Enter an expression:', anchor='sw')
@@ -177,7 +291,12 @@ class Application(Frame):
             case Mode.Factoring:
                 self.label = ttk.Label(self.frame, text='Enter an integer:', anchor='sw')
         
-        self.label.grid(row=2, column=0, columnspan=2, sticky=E+W+N+S)
+        if self.mode == Mode.Calculator:
+            self.label.grid(row=2, column=0, sticky=E+W+N+S)
+            precision_field = ttk.Combobox(self.frame, textvariable=self.var_precision, values=list(precision_options), state='readonly')
+            precision_field.grid(row=2, column=1, sticky=E+W+S)
+        else:
+            self.label.grid(row=2, column=0, columnspan=2, sticky=E+W+N+S)
 
         self.entry_field = ttk.Entry(self.frame, font=('Arial', 20))
         self.entry_field.grid(row=3, column=0, columnspan=2, sticky=E+W+N+S)
@@ -191,21 +310,29 @@ class Application(Frame):
         self.entry_field.focus()
 
     def create_plot_widgets(self):
-        if self.master.winfo_width() < 650 or self.master.winfo_height() < 700:
-            self.master.geometry('650x700')
-
         self.frame = Frame(self.master)
         self.frame.grid(row=0, column=0, sticky=E+W+N+S)
 
         self.result_field = ttk.Label(self.frame, text='\n', font=('Arial', 30), anchor='center')
-        self.result_field.grid(row=0, column=0, columnspan=2, sticky=E+W+N+S)
-
+        self.result_field.grid(row=0, column=0, columnspan=3, sticky=E+W+N+S)
+
+        self.plot_data = None
+        self.plot_formula = None
+        self.plot_samples = ''
+        self.plot_extent = None
+        self.drag_start = None
+        self.render_cache.clear()
         self.plot_original = Image.open('assets/placeholder_plot.png')
         self.plot_resized = ImageTk.PhotoImage(self.plot_original)
         self.plot_image = Canvas(self.frame, border=0, highlightthickness=0)
         self.plot_image.create_image(0, 0, image=self.plot_resized, anchor='nw', tags='IMG')
         self.plot_image.grid(row=0, sticky=W+E+N+S)
-        self.plot_image.grid(row=1, column=0, columnspan=2, sticky=E+W+N+S)
+        self.plot_image.grid(row=1, column=0, columnspan=3, sticky=E+W+N+S)
+
+        self.export_data_button = ttk.Button(self.frame, text='Export data', command=self.export_data)
+        self.export_data_button.grid(row=0, column=1, sticky=E+S)
+        self.export_button = ttk.Button(self.frame, text='Export', command=self.export)
+        self.export_button.grid(row=0, column=2, sticky=E+S)
 
         min_x_label = ttk.Label(self.frame, text='Min x:', anchor='sw')
         min_x_label.grid(row=2, column=0, sticky=E+W+N+S)
@@ -217,35 +344,164 @@ class Application(Frame):
         self.max_x_entry_field = ttk.Entry(self.frame, font=('Arial', 20))
         self.max_x_entry_field.grid(row=3, column=1, sticky=E+W+N+S)
         self.max_x_entry_field.insert(0, '10')
+        samples_label = ttk.Label(self.frame, text='Samples (optional):', anchor='sw')
+        samples_label.grid(row=2, column=2, sticky=E+W+N+S)
+        self.samples_entry_field = ttk.Entry(self.frame, font=('Arial', 20))
+        self.samples_entry_field.grid(row=3, column=2, sticky=E+W+N+S)
 
         self.label = ttk.Label(self.frame, text='Enter a function of x:', anchor='sw')
-        self.label.grid(row=4, column=0, columnspan=2, sticky=E+W+N+S)
+        self.label.grid(row=4, column=0, columnspan=3, sticky=E+W+N+S)
         self.entry_field = ttk.Entry(self.frame, font=('Arial', 20))
-        self.entry_field.grid(row=5, column=0, columnspan=2, sticky=E+W+N+S)
+        self.entry_field.grid(row=5, column=0, columnspan=3, sticky=E+W+N+S)
 
         self.master.columnconfigure(0, weight=1)
         self.master.rowconfigure(0, weight=1)
         self.frame.columnconfigure(0, weight=1)
         self.frame.columnconfigure(1, weight=1)
+        self.frame.columnconfigure(2, weight=1)
         self.frame.rowconfigure(1, weight=1)
 
         self.entry_field.bind('<Return>', self.evaluate)
         self.min_x_entry_field.bind('<Return>', self.evaluate)
         self.max_x_entry_field.bind('<Return>', self.evaluate)
+        self.samples_entry_field.bind('<Return>', self.evaluate)
         self.plot_image.bind("<Configure>", self.resize)
+        self.plot_image.bind('<MouseWheel>', self.zoom)
+        self.plot_image.bind('<Button-4>', self.zoom)
+        self.plot_image.bind('<Button-5>', self.zoom)
+        self.plot_image.bind('<ButtonPress-1>', self.start_pan)
+        self.plot_image.bind('<B1-Motion>', self.pan)
         self.entry_field.focus()
 
     def resize(self, event):
-        size = (event.width, event.height)
-        resized = self.plot_original.resize(size, Image.LANCZOS)
+        '''
+        Schedules a redraw of the plot at the new canvas size, once resize events stop coming in.
+        '''
+        if self.resize_job:
+            self.master.after_cancel(self.resize_job)
+        self.resize_job = self.master.after(resize_delay, self.redraw, (event.width, event.height))
+
+    def redraw(self, size: tuple):
+        self.resize_job = None
+        if self.plot_data:
+            self.draw_plot(size)
+            return
+        with stage('resize'):
+            resized = self.plot_original.resize(size, Image.LANCZOS)
         self.plot_resized = ImageTk.PhotoImage(resized)
         self.plot_image.delete("IMG")
         self.plot_image.create_image(0, 0, image=self.plot_resized, anchor='nw', tags='IMG')
 
-    def create_conversion_widgets(self):
-        if self.master.winfo_width() < 1000 or self.master.winfo_height() < 400:
-            self.master.geometry('1000x400')
+    def plot_size(self) -> tuple:
+        '''
+        Gets the size of the plot canvas in pixels.
+        '''
+        width, height = self.plot_image.winfo_width(), self.plot_image.winfo_height()
+        if width <= 1 or height <= 1:
+            width, height = self.plot_resized.width(), self.plot_resized.height()
+        return (width, height)
+
+    def draw_plot(self, size: tuple):
+        '''
+        Renders the current plot at the given size and draws the pixel buffer directly on the plot canvas.
+        Recently rendered sizes are reused from the render cache.
+        '''
+        rendered = self.render_cache.get(size)
+        if rendered is None:
+            rgba, extent = plotting.render_rgba(self.plot_data, *size)
+            with stage('image'):
+                rendered = (ImageTk.PhotoImage(Image.frombuffer('RGBA', size, rgba, 'raw', 'RGBA', 0, 1)), extent)
+            self.render_cache.put(size, rendered)
+        self.plot_resized, self.plot_extent = rendered
+        self.plot_image.delete("IMG")
+        self.plot_image.create_image(0, 0, image=self.plot_resized, anchor='nw', tags='IMG')
 
+    def data_x(self, pixel_x: int) -> float:
+        '''
+        Converts a horizontal pixel position on the plot canvas to an x value.
+        '''
+        left, right = self.plot_extent
+        start, end = self.view_range()
+        return start + (pixel_x - left) / (right - left) * (end - start)
+
+    def zoom(self, event):
+        '''
+        Zooms the plot in or out around the mouse position.
+        '''
+        if not self.plot_data:
+            return
+        zoom_in = event.num == 4 or event.delta > 0
+        factor = zoom_factor if zoom_in else 1 / zoom_factor
+        start, end = self.view_range()
+        center = self.data_x(event.x)
+        self.set_view(center - (center - start) * factor, center + (end - center) * factor)
+
+    def start_pan(self, event):
+        if self.plot_data:
+            self.drag_start = (event.x, *self.view_range())
+
+    def pan(self, event):
+        '''
+        Moves the plot along the x-axis while dragging.
+        '''
+        if not self.plot_data or not self.drag_start:
+            return
+        pixel_x, start, end = self.drag_start
+        left, right = self.plot_extent
+        shift = (pixel_x - event.x) / (right - left) * (end - start)
+        self.set_view(start + shift, end + shift)
+
+    def view_range(self) -> tuple:
+        '''
+        Gets the x-range currently shown, including pan/zoom steps that have not been drawn yet.
+        '''
+        if self.view_job:
+            return self.pending_view
+        return (self.plot_data.start, self.plot_data.end)
+
+    def set_view(self, start: float, end: float):
+        '''
+        Schedules a redraw of the current plot for the given x-range.
+        '''
+        self.pending_view = (start, end)
+        if not self.view_job:
+            self.view_job = self.master.after(view_delay, self.update_view)
+
+    def update_view(self):
+        self.view_job = None
+        start, end = self.pending_view
+        self.min_x_entry_field.delete(0, END)
+        self.min_x_entry_field.insert(0, f'{start:.6g}')
+        self.max_x_entry_field.delete(0, END)
+        self.max_x_entry_field.insert(0, f'{end:.6g}')
+        try:
+            _, self.plot_data = plot(start, end, self.plot_formula, *self.plot_size(), self.plot_samples)
+        except Exception as e:
+            self.result_field['text'] = str(e)
+            return
+        self.render_cache.clear()
+        self.draw_plot(self.plot_size())
+
+    def export(self):
+        if not self.plot_data:
+            return
+        file_name = plotting.export_plot(self.plot_data)
+        self.result_field['text'] = f'Plot written to\n{file_name}'
+
+    def export_data(self):
+        '''
+        Writes the raw samples of the function(s) in the entry field to a .csv file.
+        '''
+        try:
+            min_x = self.min_x_entry_field.get()
+            max_x = self.max_x_entry_field.get()
+            samples = self.samples_entry_field.get()
+            result = export_plot_samples(min_x, max_x, self.entry_field.get(), samples)
+        except Exception as e:
+            result = str(e)
+        self.result_field['text'] = result
+
+    def create_conversion_widgets(self):
         self.frame = Frame(self.master)
         self.frame.grid(row=0, column=0, sticky=E+W+N+S)
 
@@ -255,6 +511,9 @@ class Application(Frame):
         self.copy_button = ttk.Button(self.frame, text='Copy', command=self.to_clipboard)
         self.copy_button.grid(row=1, column=1, sticky=E+W+N+S)
 
+        self.cancel_button = ttk.Button(self.frame, text='Cancel', command=self.cancel, state='disabled')
+        self.cancel_button.grid(row=0, column=1, sticky=E+W+S)
+
         self.label = ttk.Label(self.frame, text='Enter the amount of the unit to convert:', anchor='sw')
         self.label.grid(row=2, column=0, columnspan=2, sticky=E+W+N+S)
         self.entry_field = ttk.Entry(self.frame, font=('Arial', 20))
@@ -282,9 +541,6 @@ class Application(Frame):
         self.entry_field.focus()
 
     def create_prime_widgets(self):
-        if self.master.winfo_width() < 1000 or self.master.winfo_height() < 400:
-            self.master.geometry('1000x400')
-
         self.frame = Frame(self.master)
         self.frame.grid(row=0, column=0, sticky=E+W+N+S)
 
@@ -294,6 +550,9 @@ class Application(Frame):
         self.copy_button = ttk.Button(self.frame, text='Copy', command=self.to_clipboard)
         self.copy_button.grid(row=1, column=1, sticky=E+W+N+S)
 
+        self.cancel_button = ttk.Button(self.frame, text='Cancel', command=self.cancel, state='disabled')
+        self.cancel_button.grid(row=0, column=1, sticky=E+W+S)
+
         self.label = ttk.Label(self.frame, text='Number of digits:', anchor='sw')
         self.label.grid(row=2, column=0, columnspan=2, sticky=E+W+N+S)
 
@@ -323,9 +582,6 @@ class Application(Frame):
         self.entry_field.focus()
 
     def create_ascii_widgets(self):
-        if self.master.winfo_width() < 1000 or self.master.winfo_height() < 400:
-            self.master.geometry('1000x400')
-
         self.frame = Frame(self.master)
         self.frame.grid(row=0, column=0, sticky=E+W+N+S)
 
@@ -370,39 +626,84 @@ class Application(Frame):
     def evaluate(self, _):
         input = self.entry_field.get()
 
-        result, file_path = '', None
-        try:
-            match self.mode:
-                case Mode.Calculator:
-                    result = calculate_expression(input) + '\n'
-                case Mode.Solve:
-                    result = solve(input) + '\n'
-                case Mode.Scientific:
-                    result = scientific(input) + '\n'
-                case Mode.Plot:
-                    min_x = self.min_x_entry_field.get()
-                    max_x = self.max_x_entry_field.get()
-                    result, file_path = plot(min_x, max_x, input)
-                case Mode.Conversion:
-                    unit_from = self.unit_from_entry_field.get()
-                    unit_to = self.unit_to_entry_field.get()
-                    result = convert(input, unit_from, unit_to)
-                case Mode.Primes:
-                    num_of_primes = self.number_of_primes_field.get()
-                    file_type = self.var_file_type.get()
-                    result = get_random_primes(num_of_primes, file_type, input)
-                case Mode.Factoring:
-                    result = prime_factorization(input) + '\n'
-                case Mode.ASCII:
-                    match self.var_encoding_base.get():
-                        case 'hexadecimal':
-                            result = message_to_ascii_hexadecimal(input) + '\n'
-                        case 'decimal':
-                            result = str(message_to_ascii_decimal(input)) + '\n'
-        except Exception as e:
-            result = str(e)
-            print(result)
-        
+        if self.request:
+            self.pool.cancel(self.request)
+            self.request = None
+
+        with instrumentation.request(self.mode.name.lower()):
+            result, plot_data = '', None
+            try:
+                match self.mode:
+                    case Mode.Calculator:
+                        return self.submit(calculate_expression, input, precision_options[self.var_precision.get()])
+                    case Mode.Solve:
+                        return self.submit(solve, input)
+                    case Mode.Scientific:
+                        result = scientific(input) + '\n'
+                    case Mode.Plot:
+                        min_x = self.min_x_entry_field.get()
+                        max_x = self.max_x_entry_field.get()
+                        samples = self.samples_entry_field.get()
+                        result, plot_data = plot(min_x, max_x, input, *self.plot_size(), samples)
+                        self.plot_formula, self.plot_samples = input, samples
+                    case Mode.Conversion:
+                        unit_from = self.unit_from_entry_field.get()
+                        unit_to = self.unit_to_entry_field.get()
+                        return self.submit(convert, input, unit_from, unit_to)
+                    case Mode.Primes:
+                        num_of_primes = self.number_of_primes_field.get()
+                        file_type = self.var_file_type.get()
+                        return self.submit(get_random_primes, num_of_primes, file_type, input)
+                    case Mode.Factoring:
+                        return self.submit(prime_factorization, input)
+                    case Mode.ASCII:
+                        match self.var_encoding_base.get():
+                            case 'hexadecimal':
+                                result = message_to_ascii_hexadecimal(input) + '\n'
+                            case 'decimal':
+                                result = str(message_to_ascii_decimal(input)) + '\n'
+            except Exception as e:
+                result = str(e)
+                print(result)
+
+            self.show_result(result, plot_data)
+        self.update_status()
+
+    def submit(self, function, *args):
+        '''
+        Runs the calculation in a worker process, so that the window stays responsive and the calculation can be cancelled.
+        '''
+        self.request = self.pool.submit(function, *args)
+        self.result_field['text'] = '\nCalculating...\n'
+        self.cancel_button['state'] = 'normal'
+        if not self.poll_job:
+            self.poll_job = self.master.after(poll_interval, self.poll_results)
+
+    def poll_results(self):
+        '''
+        Shows the result of the current calculation once its worker has finished.
+        '''
+        self.poll_job = None
+        for request_id, success, result in self.pool.poll():
+            if request_id != self.request:
+                continue
+            self.request = None
+            self.cancel_button['state'] = 'disabled'
+            if not success:
+                result = str(result)
+                print(result)
+            elif self.mode in (Mode.Calculator, Mode.Solve, Mode.Factoring):
+                result += '\n'
+            self.show_result(result)
+            self.update_status()
+        if self.pool.busy():
+            self.poll_job = self.master.after(poll_interval, self.poll_results)
+
+    def cancel(self):
+        if self.request:
+            self.pool.cancel(self.request)
+
+    def show_result(self, result: str, plot_data=None):
         match self.mode:
             case Mode.Calculator:
                 self.result_field['text'] = f'\n{result}\n'
@@ -412,13 +713,10 @@ class Application(Frame):
                 self.result_field['text'] = f'\n{result}\n'
             case Mode.Plot:
                 self.result_field['text'] = f'\n{result}' if not '\n' in result else result
-                if file_path:
-                    self.plot_original = Image.open(file_path)
-                    size = (self.plot_resized.width(), self.plot_resized.height())
-                    resized = self.plot_original.resize(size, Image.LANCZOS)
-                    self.plot_resized = ImageTk.PhotoImage(resized)
-                    self.plot_image.delete("IMG")
-                    self.plot_image.create_image(0, 0, image=self.plot_resized, anchor='nw', tags='IMG')
+                if plot_data:
+                    self.plot_data = plot_data
+                    self.render_cache.clear()
+                    self.draw_plot(self.plot_size())
             case Mode.Conversion:
                 self.result_field['text'] = f'\n{result}\n'
             case Mode.Primes:
@@ -429,8 +727,13 @@ class Application(Frame):
                 self.result_field['text'] = f'\n{result}\n'
 
 if __name__ == '__main__':
+    if {'--instrument', '--instrument-memory', '--profile'} & set(sys.argv):
+        instrumentation.configure('--instrument' in sys.argv, '--instrument-memory' in sys.argv, '--profile' in sys.argv)
     root = create_themed_window(True)
     root.geometry('1000x400')
     
     app = Application(master=root)
+    if '--startup-time' in sys.argv:
+        root.after_idle(report_startup_time, root)
+    root.after(warm_delay, app.warm_up)
     app.mainloop()
\ No newline at end of file
@@ -1,19 +1,34 @@
-from typing import List, Tuple, Union
+from __future__ import annotations
+from typing import Callable, ContextManager, List, Optional, Tuple, Union
+from concurrent.futures import Future
+from contextlib import nullcontext
+from functools import lru_cache
 import sys
 import math
 import re
 import cmath
-import matplotlib.pyplot as plt
-import numpy as np
-import sympy
+import csv
+import threading
+import time
+import mpmath
+from mpmath import mp
 from utils import is_int, is_float, float_to_formatted_string
-from forex_python.converter import CurrencyRates
 from utils import units, unit_aliases
 from datetime import datetime
+from types import CodeType
+from cache import LRUCache, PersistentCache
+from currency import CurrencyRate, RateProvider
+from lazy import lazy_import
+from instrumentation import stage
+from expression import parse, emit
+from roots import complex_roots, polynomial_roots, real_roots
+from sampling import PlotData, RangeCache, adaptive_sample, export_samples, lttb_sample, minmax_sample, value_span, view_limits
 
-numeric = Union[int, float, complex, np.number]
+# Heavy dependencies are imported when first used, so that importing this module is fast
+np = lazy_import('numpy')
+sympy = lazy_import('sympy')
 
-np.seterr(all='raise')
+numeric = Union[int, float, complex, 'np.number', mpmath.mpf]
 
 pi = math.pi
 alpha = 2.502907875095892822283902873218
@@ -28,23 +43,75 @@ rho = 1.32471795724474602596090885447809734
 e = math.e
 i = complex(0,1)
 inf = math.inf
-pattern = '(?<=[0-9a-z])(?<!log)(?<!sqrt)(?<!floor)(?<!ceil)(?<!sin)(?<!cos)(?<!tan)(?<!round)(?<!abs)(?<!inf)(?<!x)(?<!sum)(?<!product)(?<!wrap_fn)\('
-legal = ['log', 'sqrt', 'floor', 'ceil', 'sin', 'cos', 'tan', 'round', 'abs', 'pi', 'alpha', 'delta', 'theta', 'tau', 'phi', 'gamma', 'lambda', 'psi', 'rho', 'e', 'i', 'inf', 'mod', 'x', 'sum', 'product']
-pattern_graph = '(?<=[0-9a-z])(?<!log)(?<!sqrt)(?<!floor)(?<!ceil)(?<!sin)(?<!cos)(?<!tan)(?<!round)(?<!abs)(?<!x)\('
-legal_graph = ['log', 'sqrt', 'floor', 'ceil', 'sin', 'cos', 'tan', 'round', 'abs', 'pi', 'alpha', 'delta', 'theta', 'tau', 'phi', 'gamma', 'lambda', 'psi', 'rho', 'e', 'mod', 'x']
-pattern_solve = '(?<=[0-9a-z])(?<!log)(?<!sqrt)(?<!sin)(?<!cos)(?<!tan)(?<!x)\('
-legal_solve = ['log', 'sqrt', 'sin', 'cos', 'tan', 'pi', 'alpha', 'delta', 'theta', 'tau', 'phi', 'gamma', 'lambda', 'psi', 'rho', 'e', 'x', 'i']
+
+# Constants that are only known to the digits given here, which limits the precision of results using them
+tabulated_constants = {
+    'alpha': '2.502907875095892822283902873218',
+    'delta': '4.669201609102990671853203821578',
+    'theta': '1.30637788386308069046861449260260571',
+    'lambda': '1.303577269034'
+}
+# Maximum number of significant digits for arbitrary precision calculations
+max_precision = 10000
+
+# Number of terms up to which sums and products are always calculated term by term
+exact_terms = 1000
+# Number of digits up to which factorials and integer products are calculated exactly,
+# larger results are approximated as a mantissa and exponent
+exact_digits = 10**5
+# Number of terms evaluated at once by vectorized sums and products
+block_size = 2**16
+# Maximum number of significant digits shown of results that are approximated, e.g. from a sum of logarithms
+approximate_digits = 10
+# Infinite series: terms in the first block, maximum number of terms, relative tolerance,
+# and number of consecutive partial sums used to accelerate alternating series
+initial_series_terms = 1024
+series_terms = 10**7
+series_tolerance = 1e-12
+series_window = 16
+
+# Time budget in seconds of the symbolic solver, after which only the numeric roots of an equation are returned
+solve_time_budget = 5
+# Interval that is scanned for numeric roots of an equation, unless another interval is given
+root_interval = (-10.0, 10.0)
+# Relative distance below which a numeric root is considered equal to a symbolic solution
+root_match_tolerance = 1e-6
+# Lowest degree of polynomial equations that are solved without sympy.solve, whose closed forms get unwieldy from here on
+polynomial_degree = 5
+# Highest degree up to which polynomials with rational coefficients are factored to find exact linear and quadratic factors
+factor_degree = 20
+# Number of evenly spaced values of a swept parameter, and the number of them that is shown in the result table
+sweep_samples = 1001
+sweep_table_rows = 11
+
+# Maps (formula, style, term) to the compiled code object of the formatted input
+# (or to the formatted input itself for style 2, which is handed to sympy instead of eval)
+expression_cache = LRUCache(maxsize=512)
+
+# Solutions per normalized equation, as sympy.srepr text, kept on disk so that repeated equations are solved instantly after a restart.
+# Entries are invalidated when the format version is raised (e.g. when the solver changes) or sympy is upgraded
+solution_cache_path = 'output/cache/solutions.sqlite'
+solution_cache_format = 1
+solution_cache = PersistentCache(solution_cache_path, lambda: f'{solution_cache_format}-sympy-{sympy.__version__}', maxsize=512)
+
+# Rates between currencies, derived from one table of rates against the euro that is fetched at most once per hour
+currency_rates = RateProvider()
+
+# Sampled plot values per (formula, resolution level), so that panning and zooming only evaluate newly exposed ranges
+range_cache = RangeCache()
+
+# Number of significant digits of the approximations used in the calculation of the current thread (None if it is exact)
+approximation = threading.local()
 
 
 def get_currency_rate(input: str, output: str) -> numeric:
     '''
     Gets the currency rate from currency input to currency output
     '''
-    c = CurrencyRates()
-    rates = c.get_rates(input)
-    rate = rates[output]
-    return rate
+    with stage('currency'):
+        return currency_rates.rate(input, output)
 
+@lru_cache(maxsize=None)
 def get_alias(unit: str) -> str:
     '''
     Gets the best matching unit for the given unit / alias
@@ -64,10 +131,21 @@ def calcsum(start: int, end: int, f: str) -> numeric:
     '''
     if not isinstance(f, str):
         f = str(f)
+    if end == math.inf:
+        return infinite_series(f, validate_bounds(start, 0)[0], 'sum')
+    start, end = validate_bounds(start, end)
+    if end - start + 1 > exact_terms:
+        result = closed_form_sum(f, start, end)
+        if result is None:
+            result = vectorized_series(f, start, end, 'sum')
+        if result is not None:
+            return result
+    term = compile_input(f, 0, True)
     sum = 0
-    for index in range(start,end+1):
-        res = eval(f.replace('x', str(index)))
-        sum += res
+    with numpy_errors(term):
+        for index in range(start,end+1):
+            res = eval(term, globals(), {'x': index})
+            sum += res
     return sum
 
 def calcproduct(start: int, end: int, f: str) -> numeric:
@@ -76,211 +154,472 @@ def calcproduct(start: int, end: int, f: str) -> numeric:
     '''
     if not isinstance(f, str):
         f = str(f)
+    if end == math.inf:
+        return infinite_series(f, validate_bounds(start, 0)[0], 'product')
+    start, end = validate_bounds(start, end)
+    if end - start + 1 > exact_terms:
+        magnitude = log_product(f, start, end)
+        if magnitude is not None and magnitude[1] > exact_digits:
+            return approximate(*magnitude)
+        result = vectorized_series(f, start, end, 'product')
+        if magnitude is not None and result is not None and (result == 0 or math.isinf(result)):
+            return approximate(*magnitude)
+        if result is not None:
+            return result
+    term = compile_input(f, 0, True)
+    with numpy_errors(term):
+        values = [eval(term, globals(), {'x': index}) for index in range(start, end+1)]
+    if all(isinstance(value, int) for value in values):
+        return integer_product(values)
     product = 1
-    for index in range(start,end+1):
-        res = eval(f.replace('x', str(index)))
+    for res in values:
         product *= res
     return product
 
+def integer_product(values: List[int]) -> numeric:
+    '''
+    Multiplies integers with a balanced product tree (binary splitting), so that the operands of each
+    multiplication are of similar size, instead of multiplying a growing result by one term at a time.
+    Products of more than exact_digits digits are approximated from the sum of the logarithms of the values.
+    '''
+    if 0 in values:
+        return 0
+    sign = -1 if sum(value < 0 for value in values) % 2 else 1
+    exponent, fraction = split_log([math.log10(abs(value)) for value in values])
+    if exponent > exact_digits:
+        return approximate(sign, exponent, fraction, log_digits(math.fsum(abs(math.log10(abs(value))) for value in values)))
+    while len(values) > 1:
+        values = [values[k] * values[k+1] if k + 1 < len(values) else values[k] for k in range(0, len(values), 2)]
+    return values[0] if values else 1
+
+def log_product(f: str, start: int, end: int) -> Tuple[int, int, float, int]:
+    '''
+    Calculates the sign, and the base 10 logarithm of the absolute value split into an integer and a fraction,
+    of the product of f(x) from start to end, by evaluating f over blocks of x values with numpy,
+    along with the number of significant digits that the sum of the logarithms supports.
+    Returns None if f cannot be evaluated as a real float function, or the product is zero.
+    '''
+    try:
+        code = compile_input(f, 1)
+    except ValueError:
+        return None
+    sign, logs, magnitude = 1, [], 0.0
+    for block_start in range(start, end + 1, block_size):
+        x = np.arange(block_start, min(block_start + block_size, end + 1), dtype=float)
+        with np.errstate(all='ignore'):
+            try:
+                y = np.broadcast_to(eval(code, globals(), {'x': x}), x.shape)
+            except (TypeError, ValueError, ArithmeticError):
+                return None
+            if np.iscomplexobj(y) or not np.isfinite(y).all() or not y.all():
+                return None
+            if np.count_nonzero(y < 0) % 2:
+                sign = -sign
+            block = np.log10(np.abs(y))
+            total = math.fsum(block)
+            logs += [total, math.fsum(np.append(block, -total))]
+            magnitude += float(np.abs(block).sum())
+    return (sign, *split_log(logs), log_digits(magnitude))
+
+def split_log(logs: List[float]) -> Tuple[int, float]:
+    '''
+    Sums the logarithms exactly into an integer and a fraction in [0, 1),
+    as a single float would lose the precision of the fraction for large sums.
+    '''
+    exponent = math.floor(math.fsum(logs))
+    fraction = math.fsum(logs + [-exponent])
+    shift = math.floor(fraction)
+    return exponent + shift, fraction - shift
+
+def log_digits(magnitude: float) -> int:
+    '''
+    Gets the number of significant digits of a number calculated from a sum of base 10 logarithms whose absolute values add up to magnitude.
+    Each logarithm may be off by a rounding error relative to its size, and an absolute error of the sum is a relative error of the number.
+    '''
+    error = magnitude * sys.float_info.epsilon * math.log(10)
+    if error == 0:
+        return approximate_digits
+    return max(1, min(approximate_digits, math.floor(-math.log10(error))))
+
+def approximate(sign: int, exponent: int, fraction: float, digits: int = approximate_digits) -> mpmath.mpf:
+    '''
+    Gets the approximate number sign * 10^(exponent + fraction), which may be far beyond the range of a float,
+    and marks the current calculation as approximated to the given number of significant digits.
+    '''
+    mark_approximate(digits)
+    return sign * mpmath.power(10, fraction) * mpmath.power(10, exponent)
+
+def mark_approximate(digits: int):
+    '''
+    Marks the calculation of the current thread as approximate, so that its result is shown with at most the given number of significant digits.
+    '''
+    current = getattr(approximation, 'digits', None)
+    approximation.digits = digits if current is None else min(current, digits)
+
+def factorial(n: numeric) -> numeric:
+    '''
+    Calculates n!, extended to non-integer and complex numbers through the gamma function: n! = Γ(n+1).
+    Factorials of more than exact_digits digits are approximated through the log-gamma function.
+    '''
+    if isinstance(n, complex) and n.imag == 0:
+        n = n.real
+    if isinstance(n, float) and n.is_integer():
+        n = int(n)
+    if isinstance(n, int):
+        if n < 0:
+            raise ValueError(f'Factorial is undefined for negative integers: {n}!')
+        if math.lgamma(n + 1) / math.log(10) > exact_digits:
+            # Evaluated at mpmath's working precision, shown with at most approximate_digits like other approximations
+            mark_approximate(min(approximate_digits, mp.dps))
+            return mpmath.factorial(n)
+        return math.factorial(n)
+    if isinstance(n, float):
+        try:
+            return math.gamma(n + 1)
+        except OverflowError:
+            return mpmath.gamma(n + 1)
+    if isinstance(n, complex):
+        result = mpmath.gamma(mpmath.mpc(n) + 1)
+        return complex(result) if mpmath.isfinite(result) else result
+    return mpmath.factorial(n)
+
+def validate_bounds(start: numeric, end: numeric) -> Tuple[int, int]:
+    '''
+    Validates that the start and end of a sum or product are integers.
+    '''
+    bounds = []
+    for bound in (start, end):
+        if isinstance(bound, complex) and bound.imag == 0:
+            bound = bound.real
+        if isinstance(bound, mpmath.mpf) and mpmath.isint(bound):
+            bound = int(bound)
+        if isinstance(bound, float) and bound.is_integer():
+            bound = int(bound)
+        if not isinstance(bound, int):
+            raise ValueError(f'Invalid bound: {format_output(bound)}. The start and end must be integers.')
+        bounds.append(bound)
+    return tuple(bounds)
+
+def closed_form_sum(f: str, start: int, end: Union[int, sympy.Expr]) -> numeric:
+    '''
+    Calculates the sum of f(x) from start to end through its closed form, if f is a polynomial or geometric in x.
+    The end may be sympy.oo for an infinite series.
+    Returns None if f is neither, or cannot be handled symbolically.
+    '''
+    try:
+        term = sympy.sympify(compile_input(f, 2), locals=sympy_constants())
+    except Exception:
+        return None
+    x = sympy.Symbol('x')
+    if not term.has(x):
+        return None
+    if not term.is_polynomial(x):
+        ratio = sympy.simplify(term.subs(x, x + 1) / term)
+        if ratio.has(x):
+            return None
+    result = sympy.summation(term, (x, start, end))
+    if result.has(sympy.Sum):
+        return None
+    if result.has(sympy.oo, -sympy.oo, sympy.zoo, sympy.nan):
+        raise ValueError('The series diverges.')
+    if result.is_Integer:
+        return int(result)
+    result = complex(result.evalf())
+    return result.real if result.imag == 0 else result
+
+def infinite_series(f: str, start: int, operation: str) -> numeric:
+    '''
+    Calculates the infinite sum or product of f(x) from start, by evaluating f in blocks of terms until
+    the accelerated partial sums converge. Products are calculated as the exponent of the sum of the logarithms of f(x).
+    Alternating series are accelerated with the Shanks transformation (Wynn's epsilon algorithm) of consecutive
+    partial sums. Other series apply it to partial sums at doubling numbers of terms, which removes tails that
+    decay like a power of the number of terms.
+    Raises a ValueError if the terms do not tend to zero, or the estimates do not settle within the term budget.
+    '''
+    if operation == 'sum':
+        result = closed_form_sum(f, start, sympy.oo)
+        if result is not None:
+            return result
+
+    total, count, block = 0, 0, initial_series_terms
+    checkpoints, estimates, first_magnitude = [], [], None
+    while count < series_terms:
+        y = term_values(f, start + count, start + count + block)
+        if operation == 'product':
+            if (y == 0).any():
+                return 0
+            with np.errstate(all='ignore'):
+                y = np.log(y.astype(complex))
+            if not np.iscomplexobj(y) or (y.imag == 0).all():
+                y = y.real
+        if not np.isfinite(y).all():
+            index = start + count + int(np.argmin(np.isfinite(y)))
+            raise ValueError(f'The {"series" if operation == "sum" else "product"} is undefined at x = {index}.')
+
+        magnitude = float(np.abs(y[-len(y)//4:]).max())
+        if first_magnitude is None:
+            first_magnitude = magnitude
+            alternating = not np.iscomplexobj(y) and len(y) > 1 and (np.sign(y[1:]) == -np.sign(y[:-1])).all()
+        elif count >= 4 * initial_series_terms and magnitude > 0 and magnitude >= first_magnitude / 2:
+            if operation == 'product':
+                raise ValueError('The product diverges: its factors do not tend to one.')
+            raise ValueError('The series diverges: its terms do not tend to zero.')
+
+        partial_sums = total + np.cumsum(y)
+        total = partial_sums[-1]
+        count += block
+        if alternating:
+            estimates.append(shanks(partial_sums[-series_window:]))
+        else:
+            checkpoints.append(total)
+            estimates.append(shanks(checkpoints))
+            block *= 2
+
+        converged = len(estimates) >= 2 and not y.any() and estimates[-1] == estimates[-2]
+        # Only accept an estimate once the terms shrink, as the partial sums of e.g. (-1)^x also settle after acceleration
+        decaying = magnitude < first_magnitude / 2 or magnitude == 0
+        if decaying and (converged or len(estimates) >= 3):
+            scale = max(abs(estimates[-1]), 1)
+            if converged or (abs(estimates[-1] - estimates[-2]) <= series_tolerance * scale and abs(estimates[-2] - estimates[-3]) <= 10 * series_tolerance * scale):
+                result = estimates[-1]
+                mark_approximate(min(approximate_digits, math.floor(-math.log10(series_tolerance))))
+                if operation == 'product':
+                    result = cmath.exp(result) if isinstance(result, complex) else math.exp(result)
+                return complex(result) if isinstance(result, complex) else float(result)
+    raise ValueError(f'The {"series" if operation == "sum" else "product"} diverges or converges too slowly to evaluate within {series_terms} terms (last estimate: {format_output(estimates[-1])}).')
+
+def term_values(f: str, start: int, end: int) -> np.ndarray:
+    '''
+    Evaluates f(x) for the integers x from start up to (excluding) end, vectorized if f is a real float function.
+    '''
+    x = np.arange(start, end, dtype=float)
+    try:
+        with np.errstate(all='ignore'):
+            y = np.broadcast_to(eval(compile_input(f, 1), globals(), {'x': x}), x.shape)
+        if not np.iscomplexobj(y) and not np.isnan(y).any():
+            return y.astype(float)
+    except (TypeError, ValueError, ArithmeticError):
+        pass
+    term = compile_input(f, 0, True)
+    return np.array([eval(term, globals(), {'x': index}) for index in range(start, end)], dtype=complex)
+
+def shanks(sequence: List[numeric]) -> numeric:
+    '''
+    Extrapolates the limit of a converging sequence with Wynn's epsilon algorithm (iterated Shanks transformation).
+    '''
+    previous = [0.0] * (len(sequence) + 1)
+    current = [complex(s) if isinstance(s, complex) else float(s) for s in sequence]
+    best = current[-1]
+    for k in range(1, len(sequence)):
+        following = []
+        for n in range(len(current) - 1):
+            difference = current[n+1] - current[n]
+            if difference == 0:
+                return best
+            following.append(previous[n+1] + 1 / difference)
+        previous, current = current, following
+        if k % 2 == 0 and current:
+            best = current[-1]
+    return best
+
+def precise_constant(name: str) -> Union[mpmath.mpf, mpmath.mpc]:
+    '''
+    Gets the value of the named constant at the current mpmath precision.
+    '''
+    return constant_value(name, mp.dps)
+
+@lru_cache(maxsize=None)
+def constant_value(name: str, digits: int) -> Union[mpmath.mpf, mpmath.mpc]:
+    '''
+    Calculates the named constant to the given number of significant digits, once per precision.
+    '''
+    with mp.workdps(digits):
+        match name:
+            case 'pi':
+                return +mp.pi
+            case 'tau':
+                return 2 * mp.pi
+            case 'e':
+                return +mp.e
+            case 'phi':
+                return +mp.phi
+            case 'gamma':
+                return +mp.euler
+            case 'i':
+                return mp.mpc(0, 1)
+            case 'inf':
+                return mp.inf
+            case 'psi':
+                # Reciprocal Fibonacci constant: sum of 1/F(n)
+                total, a, b = mp.zero, 1, 1
+                threshold = mp.mpf(10) ** -(digits + 5)
+                while (term := 1 / mp.mpf(a)) > threshold:
+                    total += term
+                    a, b = b, a + b
+                return total
+            case 'rho':
+                # Plastic number: real root of x^3 = x + 1
+                root = mp.sqrt(69)
+                return mp.cbrt((9 + root) / 18) + mp.cbrt((9 - root) / 18)
+            case _:
+                return mp.mpf(tabulated_constants[name])
+
+def precise_sum(start: numeric, end: numeric, f: str) -> mpmath.mpf:
+    '''
+    Calculates the sum of f(x) from start to end at the current mpmath precision.
+    Infinite series are accelerated by mpmath.
+    '''
+    term = compile_input(f, 3, True)
+    if end == mp.inf:
+        return mp.nsum(lambda index: eval(term, globals(), {'x': index}), [validate_bounds(start, 0)[0], mp.inf])
+    start, end = validate_bounds(start, end)
+    return mp.fsum(eval(term, globals(), {'x': mp.mpf(index)}) for index in range(start, end + 1))
+
+def precise_product(start: numeric, end: numeric, f: str) -> mpmath.mpf:
+    '''
+    Calculates the product of f(x) from start to end at the current mpmath precision.
+    Infinite products are accelerated by mpmath.
+    '''
+    term = compile_input(f, 3, True)
+    if end == mp.inf:
+        return mp.nprod(lambda index: eval(term, globals(), {'x': index}), [validate_bounds(start, 0)[0], mp.inf])
+    start, end = validate_bounds(start, end)
+    return mp.fprod(eval(term, globals(), {'x': mp.mpf(index)}) for index in range(start, end + 1))
+
+def validate_precision(precision: Union[int, str]) -> int:
+    '''
+    Validates the number of significant digits for an arbitrary precision calculation.
+    '''
+    if not is_int(str(precision)) or not 1 <= int(precision) <= max_precision:
+        raise ValueError(f'Invalid precision: {precision}. Please give a number of digits between 1 and {max_precision}.')
+    return int(precision)
+
+def sympy_constants() -> dict:
+    '''
+    Gets the mapping of constant names in formatted solve-style input to sympy values.
+    '''
+    return {
+        'pi': sympy.pi, 'e': sympy.E, 'i': sympy.I, 'tau': 2 * sympy.pi,
+        'alpha': sympy.Float(alpha), 'delta': sympy.Float(delta), 'theta': sympy.Float(theta), 'phi': sympy.GoldenRatio,
+        'gamma': sympy.EulerGamma, 'lambda_var': sympy.Float(lambda_var), 'psi': sympy.Float(psi), 'rho': sympy.Float(rho)
+    }
+
+def vectorized_series(f: str, start: int, end: int, operation: str) -> numeric:
+    '''
+    Calculates the sum or product of f(x) from start to end by evaluating f over blocks of x values with numpy.
+    Integer-only terms are summed exactly, as long as each block sum fits in a float without rounding.
+    Returns None if f cannot be evaluated as a real finite float function, so that the caller can fall back to exact evaluation.
+    '''
+    try:
+        code = compile_input(f, 1)
+    except ValueError:
+        return None
+    term = compile_input(f, 0, True)
+    integer = all(isinstance(eval(term, globals(), {'x': index}), int) for index in range(start, min(start + 3, end + 1)))
+    if integer and operation == 'product':
+        return None
+
+    results = []
+    for block_start in range(start, end + 1, block_size):
+        x = np.arange(block_start, min(block_start + block_size, end + 1), dtype=float)
+        with np.errstate(all='ignore'):
+            try:
+                y = np.broadcast_to(eval(code, globals(), {'x': x}), x.shape)
+            except (TypeError, ValueError, ArithmeticError):
+                return None
+            if np.iscomplexobj(y) or not np.isfinite(y).all():
+                # e.g. division by zero, which the exact evaluation reports
+                return None
+            if operation == 'product':
+                results.append(np.prod(y))
+            elif integer:
+                if np.abs(y).max() * len(y) >= 2**53:
+                    return None
+                results.append(int(y.sum()))
+            else:
+                results.append(y.sum())
+    if operation == 'product':
+        return float(np.prod(results))
+    return sum(results) if integer else math.fsum(results)
+
 def wrap_fn(fn: str, input: str) -> numeric:
     '''
     Wraps function calls to convert complex to real numbers.
     '''
     return eval(f'{fn}({input}{".real" if hasattr(input, "real") and input.imag == 0 else ""})')
 
-def calculate(input: str) -> numeric:
+def calculate(input: Union[str, CodeType]) -> numeric:
     '''
     Calculate the result of a mathematical expression.
     The result is written under key 'val' in the input dictionary of the same name.
     '''
-    return eval(input)
+    with numpy_errors(input):
+        return eval(input)
 
-def format_input(input: str, style: int) -> str:
+def numpy_errors(code: Union[str, CodeType]) -> ContextManager:
     '''
-    Sanitize and format the user-input mathematical expression
-    Style 0 = math, 1 = graph, 2 = solve
-    '''
-    # Get list of 'words' included in the user input
-    word_list = re.sub('(?:[0-9]|[^\w])', ' ', input).split()
-
-    # Validate for each distinct style if all word occurrences are allowed
-    if style == 0:
-        for word in word_list:
-            if not word in legal:
-                raise ValueError(f'Illegal argument: {word}')
-    elif style == 1:
-        for word in word_list:
-            if not word in legal_graph:
-                raise ValueError(f'Illegal argument: {word}')
-    elif style == 2:
-        for word in word_list:
-            if not word in legal_solve:
-                raise ValueError(f'Illegal argument: {word}')
-
-    # Replace operators with python notation / functions
-    input = input.replace('mod', '%')
-    if style == 0:
-        input = input.replace('sin', 'cmath.sin')
-        input = input.replace('cos', 'cmath.cos')
-        input = input.replace('tan', 'cmath.tan')
-        input = input.replace('floor(', 'wrap_fn(\'math.floor\',')
-        input = input.replace('ceil(', 'wrap_fn(\'math.ceil\',')
-        input = input.replace('round(', 'wrap_fn(\'round\',')
-        input = input.replace('sqrt', 'cmath.sqrt')
-        input = input.replace('log', 'cmath.log')
-        input = input.replace('sum', 'calcsum')
-        input = input.replace('product', 'calcproduct')
-    elif style == 1:
-        input = input.replace('sin', 'np.sin')
-        input = input.replace('cos', 'np.cos')
-        input = input.replace('tan', 'np.tan')
-        input = input.replace('round', 'np.round_')
-        input = input.replace('floor', 'np.floor')
-        input = input.replace('ceil', 'np.ceil')
-        input = input.replace('sqrt', 'np.sqrt')
-        input = input.replace('log', 'np.log')
-    input = input.replace(')(', ')*(')
-    input = input.replace('^', '**')
-    input = input.replace('lambda', 'lambda_var')
-
-    # Prepend and append multiplication symbols to any strings 
-    # matching the pattern depending on the style
-    if style == 0:
-        input = re.sub(pattern, '*(', input)
-    elif style == 1:
-        input = re.sub(pattern_graph, '*(', input)
-    elif style == 2:
-        input = re.sub(pattern_solve, '*(', input)
-    input = re.sub('\)(?=[0-9a-z])', ')*', input)
-
-    # For any indices where a number is followed by a letter or vice versa,
-    # Insert a multiplication symbol
-    indices = []
-    for index, char in enumerate(input):
-        if len(input) > index+1:
-            if re.search('[\d]', char):
-                next_char = input[index+1]
-                if re.search('[a-z]', next_char):
-                    indices.append(index)
-        if len(input) > index+1:
-            if re.search('[a-z]', char):
-                next_char = input[index+1]
-                if re.search('[\d]', next_char):
-                    indices.append(index)
-    for index in reversed(indices):
-        input = input[:index+1] + '*' + input[index+1:]
-    
-    # If using the math command, validate formatting for sum and product functions
-    if style == 0:
-        indices = []
-        for index, char in enumerate(input):
-            if char == 'x':
-                check = 0
-                j = index
-                parentheses = 0
-                while j >= 0:
-                    if input[j] == ',':
-                        indices.append(j)
-                        check += 1
-                        break
-                    elif input[j] == '(':
-                        parentheses += 1
-                    elif input[j] == ')':
-                        parentheses -= 1
-                    j -= 1
-                j = index
-                while len(input) > j:
-                    if input[j] == '(':
-                        parentheses += 1
-                    elif input[j] == ')' and parentheses == 0:
-                        indices.append(j-1)
-                        check += 1
-                        break
-                    elif input[j] == ')':
-                        parentheses -= 1
-                    j += 1
-                if not check == 2:
-                    raise ValueError(f'Incorrectly formatted function f(x) at index {index}')
-        for index in sorted(indices, reverse=True):
-            input = input[:index+1] + '\'' + input[index+1:]
-    
-    # If using the math command, format factorials
-    if style == 0:
-        # Get all indices of occurrences of '!'
-        indices = [i for i, char in enumerate(input) if char == '!']
-        # Construct a dictionary mapping each index of an occurrence of '!' to its depth level of parentheses.
-        # E.g. (10!)! would have depth 1 for the first occurrence, and depth 0 for the second.
-        parentheses_depth_dict = {}
-        for index in indices:
-            parentheses_depth_dict[index] = parentheses_depth(input, index)
-        
-        # Loop through occurrences of '!' in descending order of parentheses depth level
-        processed = []
-        for occurrence in sorted([i for i in range(len(indices))], key=lambda i: parentheses_depth_dict[indices[i]], reverse=True):
-            # In each iteration an occurrence is removed, 
-            # hence for each occurrence we need to subtract 1 for each processed earlier occurrence
-            occurrence -= len([p for p in processed if p < occurrence])
-
-            # Get the current index of this occurrence
-            index = index_of_occurrence(input, '!', occurrence+1)
-
-            # Replace f(x)! by math.factorial(f(x))
-            # First replace the '!' by ')'
-            input = input[:index] + ')' + input[index+1:]
-            # Then find the index to insert 'math.factorial('
-            parentheses = 0
-            for i, char in enumerate(reversed(input[:index])):
-                if char == ')':
-                    parentheses += 1
-                    continue
-                elif char == '(':
-                    parentheses -= 1
-                    continue
-                # If this is the first character of the string, then insert here
-                if index - i == 1:
-                    input = 'math.factorial(' + input
-                    break
-                # If this is a number and the next (i.e. preceding) character is not a number, insert here
-                elif parentheses == 0 and re.search('[\d]', char):
-                    if not re.search('[\d]', input[index-i-2]):
-                        input = input[:index-i-1] + 'math.factorial(' + input[index-i-1:]
-                        break
-                # If this character is not a number and not a letter, decimal point, or underscore, insert here
-                elif parentheses == 0 and not re.search('[a-z]|\.|_', char):
-                    input = input[:index-i-1] + 'math.factorial(' + input[index-i-1:]
-                    break
-                
-
-            processed.append(occurrence)
+    Makes numpy raise on overflow and invalid values while evaluating code that uses numpy, like Python's math functions do.
+    Numpy's error state is per thread, so it is set around each evaluation instead of once when numpy is imported.
+    Code that does not use numpy leaves it unimported.
+    '''
+    if isinstance(code, CodeType) and 'np' not in code.co_names:
+        return nullcontext()
+    return np.errstate(all='raise')
 
-    return input
+def compile_input(formula: str, style: int, term: bool = False, parameters: Tuple[str, ...] = ()) -> Union[str, CodeType]:
+    '''
+    Format and compile the user-input mathematical expression, using the expression cache.
+    Style 0 = math, 1 = graph, 2 = solve, 3 = math in arbitrary precision
+    Styles 0, 1 and 3 return a code object, style 2 returns the formatted input.
+    '''
+    key = (formula, style, term, parameters)
+    compiled = expression_cache.get(key)
+    if compiled is None:
+        compiled = format_input(formula, style, term, parameters)
+        if style != 2:
+            compiled = compile(compiled, '<input>', 'eval')
+        expression_cache.put(key, compiled)
+    return compiled
+
+def set_cache_size(size: int):
+    '''
+    Sets the maximum number of compiled expressions kept in the expression cache.
+    '''
+    expression_cache.maxsize = size
 
-def parentheses_depth(input: str, index: int) -> int:
+def cache_info() -> dict:
     '''
-    Get the depth level of parentheses at the given index in the input string.
+    Gets the hit/miss counters and size of the expression cache.
     '''
-    depth = 0
-    for char in input[:index]:
-        if char == '(':
-            depth += 1
-        elif char == ')':
-            depth -= 1
-    return depth
+    return expression_cache.info()
 
-def index_of_occurrence(input: str, sub: str, n: int) -> int:
+def format_input(input: str, style: int, term: bool = False, parameters: Tuple[str, ...] = ()) -> str:
     '''
-    Gets the index of the nth occurrence of the given substring in the input string.
+    Sanitize and format the user-input mathematical expression
+    Style 0 = math, 1 = graph, 2 = solve, 3 = math in arbitrary precision
+    If term is True, the input is the function f(x) of a sum or product.
+    Parameters are additional variable names that are allowed, e.g. a parameter that is swept when solving.
     '''
-    occurrence, index = 0, 0
-    while occurrence < n:
-        index = input[index+(1 if index > 0 else 0):].index(sub) + index + (1 if index > 0 else 0)
-        occurrence += 1
-    return index
+    return emit(parse(input), style, term, parameters)
 
-def format_output(result: numeric) -> str:
+def format_output(result: numeric, digits: int = None) -> str:
     '''
     Format the output result as a mathematical expression
+    Arbitrary precision results are shown with the given number of significant digits.
     '''
+    if digits and isinstance(result, (mpmath.mpf, mpmath.mpc)):
+        return format_precise(result, digits)
+    if isinstance(result, int) and result.bit_length() * math.log10(2) > (sys.get_int_max_str_digits() or math.inf):
+        result = mpmath.mpf(result)
+    if isinstance(result, (mpmath.mpf, mpmath.mpc)):
+        if mpmath.isfinite(result) and (result == 0 or 1e-300 < abs(result) < 1e300):
+            result = complex(result) if isinstance(result, mpmath.mpc) else float(result)
+        elif isinstance(result, mpmath.mpc):
+            return f'{format_output(result.real)} + {format_output(result.imag)}i'
+        elif mpmath.isinf(result):
+            return '∞' if result > 0 else '-∞'
+        else:
+            return mpmath.nstr(result, 15).replace('e', ' • 10^').replace('+', '')
     if isinstance(result, complex):
         if cmath.isclose(result.imag, 0, abs_tol=1*10**(-11)):
             result = result.real
@@ -318,6 +657,24 @@ def format_output(result: numeric) -> str:
 
     return result
 
+def format_precise(result: Union[mpmath.mpf, mpmath.mpc], digits: int) -> str:
+    '''
+    Format an arbitrary precision result with the given number of significant digits.
+    '''
+    if isinstance(result, mpmath.mpc):
+        tolerance = mp.mpf(10) ** (1 - digits) * max(abs(result), 1)
+        if abs(result.imag) <= tolerance:
+            result = result.real
+        elif abs(result.real) <= tolerance:
+            return f'{format_precise(result.imag, digits)}i'
+        else:
+            return f'{format_precise(result.real, digits)}{"-" if result.imag < 0 else "+"}{format_precise(abs(result.imag), digits)}i'
+    if mpmath.isinf(result):
+        return '∞' if result > 0 else '-∞'
+    if mpmath.isint(result) and abs(result) < mp.mpf(10) ** digits:
+        return str(int(result))
+    return mpmath.nstr(result, digits).replace('e', ' • 10^').replace('+', '')
+
 def beautify_input(input: str) -> str:
     '''
     Make the user-input pretty when showing it in the result
@@ -343,10 +700,9 @@ def beautify_input(input: str) -> str:
     input = input.replace('s𝑖n', 'sin')
     return input
 
-def solve_for_x(input: str) -> List[numeric]:
+def split_equation(input: str) -> Tuple[str, str]:
     '''
-    Reformat input and solve the resulting mathematical equality for x.
-    Output(s) are added to the values of dictionary 'val'.
+    Substitutes the constants in the formatted input of an equation for sympy, and splits it into its two sides.
     '''
     input = input.replace('pi', str(pi))
     input = input.replace('alpha', str(alpha))
@@ -355,7 +711,7 @@ def solve_for_x(input: str) -> List[numeric]:
     input = input.replace('tau', str(tau))
     input = input.replace('phi', str(phi))
     input = input.replace('gamma', str(gamma))
-    input = input.replace('lambda', str(lambda_var))
+    input = input.replace('lambda_var', str(lambda_var))
     input = input.replace('psi', str(psi))
     input = input.replace('rho', str(rho))
     input = input.replace('e', str(e))
@@ -368,35 +724,233 @@ def solve_for_x(input: str) -> List[numeric]:
         raise ValueError('No equality sign \'=\' in equation')
     elif len(inputs) > 2:
         raise ValueError('More than one equality sign \'=\' in equation')
-    input = f'Eq({inputs[0]}, {inputs[1]})'
-    equation = sympy.sympify(input)
-    solutions = sympy.solve(equation)
-    result = []
+    return inputs[0], inputs[1]
+
+def solve_for_x(input: str, start: Optional[float] = None, end: Optional[float] = None, time_budget: float = solve_time_budget) -> List[numeric]:
+    '''
+    Reformat input and solve the resulting mathematical equality for x.
+    Sympy solves the equation symbolically in a background thread, while its real roots on [start, end]
+    are found numerically. Numeric roots that sympy did not find are added to its solutions.
+    If sympy fails or takes longer than the time budget, only the numeric roots are returned.
+    Solutions are kept in the solution cache, unless they are only the numeric roots.
+    '''
+    key = f'{normalize_equation(input)};{start};{end}'
+    return cached_solutions(key, lambda: find_solutions(input, start, end, time_budget))
+
+def find_solutions(input: str, start: Optional[float], end: Optional[float], time_budget: float) -> Tuple[List[numeric], bool]:
+    '''
+    Solves the equation for x, and returns its solutions and whether they are complete,
+    i.e. whether the polynomial or symbolic solve finished instead of falling back to the numeric roots.
+    '''
+    inputs = split_equation(input)
+    deadline = time.perf_counter() + time_budget
+    expression = sympy.sympify(f'({inputs[0]}) - ({inputs[1]})')
+    with stage('polynomial'):
+        solutions = solve_polynomial(expression)
+    if solutions is not None:
+        return solutions, True
+
+    equation = sympy.sympify(f'Eq({inputs[0]}, {inputs[1]})')
+    future = solve_symbolic(equation)
+
+    with stage('numeric'):
+        roots = numeric_roots(expression, start, end)
+    try:
+        with stage('sympy'):
+            solutions = future.result(timeout=max(0, deadline - time.perf_counter()))
+    except Exception as error:
+        if not roots and not isinstance(error, (TimeoutError, NotImplementedError)):
+            raise
+        return [root_to_sympy(root) for root in roots], False
+
+    result = [solution.evalf(15) if solution.has(sympy.Float) else solution for solution in solutions]
+    if solutions and any(isinstance(root, complex) for root in roots):
+        # Complex roots are only searched for as a fallback, and the search is not exhaustive
+        return result, True
+    values = []
     for solution in solutions:
-        result.append(solution)
-    return result
+        # Only real solutions can match a real root, and numeric evaluation of complex roots of polynomials is slow
+        if solution.is_real is not False:
+            try:
+                values.append(complex(sympy.N(solution)))
+            except TypeError:
+                pass
+    for root in roots:
+        if not any(abs(root - value) <= root_match_tolerance * max(1, abs(value)) for value in values):
+            result.append(root_to_sympy(root))
+    return result, True
+
+def normalize_equation(input: str) -> str:
+    '''
+    Removes the whitespace from a formatted equation, so that equations that only differ in spacing share a cache key.
+    '''
+    return re.sub(r'\s+', '', input)
 
-def plot_func(x: np.ndarray, input: str) -> dict:
+def cached_solutions(key: str, solve: Callable[[], Tuple[List[sympy.Expr], bool]]) -> List[sympy.Expr]:
     '''
-    Plot the given function 'input' for given range x.
-    Output(s) are added to the values of dictionary 'val'.
+    Gets the solutions for the key from the solution cache, or solves them.
+    Solve returns the solutions and whether they are complete; incomplete solutions (e.g. after a timeout) are not cached.
     '''
-    val = {}
-    def func(x):
-        return eval(input)
-    for i in x:
-        val[i] = func(i)
-    return val
+    with stage('cache'):
+        text = solution_cache.get(key)
+    if text is not None:
+        return list(sympy.sympify(text))
+    solutions, complete = solve()
+    if complete:
+        solution_cache.put(key, sympy.srepr(list(solutions)))
+    return solutions
+
+def solve_polynomial(expression: sympy.Expr) -> Optional[List[numeric]]:
+    '''
+    Solves a polynomial equation in x of at least polynomial_degree, or returns None if the expression is not one.
+    Polynomials with rational coefficients are split into square-free factors, or into irreducible factors if that is cheap,
+    so that linear and quadratic factors give exact roots. The other roots are eigenvalues of companion matrices.
+    '''
+    x = sympy.Symbol('x')
+    try:
+        poly = sympy.Poly(expression, x)
+    except sympy.PolynomialError:
+        return None
+    if poly.degree() < polynomial_degree:
+        return None
+    if poly.domain.is_ZZ or poly.domain.is_QQ:
+        factors = sympy.factor_list(poly)[1] if poly.degree() <= factor_degree else sympy.sqf_list(poly)[1]
+    else:
+        factors = [(poly, 1)]
+
+    solutions = []
+    for factor, _ in factors:
+        if factor.degree() <= 2:
+            solutions += list(sympy.roots(factor))
+            continue
+        try:
+            coefficients = [complex(coefficient) for coefficient in factor.all_coeffs()]
+        except TypeError:
+            return None # coefficients with other symbols
+        if not all(cmath.isfinite(coefficient) for coefficient in coefficients):
+            return None
+        solutions += [root_to_sympy(root) for root in polynomial_roots(coefficients)]
+    return sorted(solutions, key=lambda solution: (complex(solution).real, complex(solution).imag))
+
+def solve_symbolic(equation: sympy.Basic, symbol: Optional[sympy.Symbol] = None) -> Future:
+    '''
+    Starts solving the equation with sympy in a background thread (for the given symbol, if the equation has several),
+    and returns a future of its solutions.
+    Sympy has no way to interrupt it, so after a timeout the daemon thread is abandoned and its result dropped.
+    It is not traced to stop it early, as a trace function on every Python call would slow down every solve a few times.
+    The app and the server run calculations in worker processes, which are killed when a request runs out of time, taking abandoned threads with them.
+    Floats (e.g. substituted constants) are kept as floats instead of being converted to rationals,
+    which could lead sympy into huge integer powers that block the interpreter for a long time.
+    '''
+    future = Future()
+    def run():
+        try:
+            future.set_result(sympy.solve(equation, *([symbol] if symbol else []), rational=False))
+        except Exception as error:
+            future.set_exception(error)
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+def numeric_roots(expression: sympy.Basic, start: Optional[float] = None, end: Optional[float] = None) -> List[numeric]:
+    '''
+    Finds the roots of the expression in x on [start, end] numerically.
+    Real roots are found by scanning for sign changes and near-zeros. If there are none, complex roots are searched for.
+    '''
+    if start is None or end is None:
+        start, end = root_interval
+    x = sympy.Symbol('x')
+    if expression.free_symbols != {x}:
+        return []
+    try:
+        f = sympy.lambdify(x, expression, 'numpy')
+        df = sympy.lambdify(x, sympy.diff(expression, x), 'numpy')
+    except Exception:
+        return []
+    return real_roots(f, df, start, end) or complex_roots(f, df, start, end)
+
+def root_to_sympy(root: numeric) -> sympy.Expr:
+    '''
+    Converts a numeric root to a sympy number with 15 significant digits, or to an integer if it is one.
+    '''
+    if isinstance(root, complex):
+        return root_to_sympy(root.real) + root_to_sympy(root.imag) * sympy.I
+    if abs(root - round(root)) <= root_match_tolerance * 1e-6 * max(1, abs(root)):
+        return sympy.Integer(round(root))
+    return sympy.Float(root, 15)
 
-def calculate_expression(formula: str) -> str:
+def plot_func(x: np.ndarray, input: Union[str, CodeType]) -> np.ndarray:
+    '''
+    Evaluate the given function 'input' over the whole range x at once.
+    Points where the function is undefined or not real are NaN.
+    '''
+    with np.errstate(all='ignore'):
+        try:
+            y = eval(input, globals(), {'x': x})
+        except (TypeError, ValueError, ArithmeticError):
+            # Fall back to evaluating point by point, so that only the failing points are lost
+            y = np.array([plot_point(value, input) for value in x])
+        return to_real_array(y, x.shape)
+
+def plot_point(x: float, input: Union[str, CodeType]) -> numeric:
+    '''
+    Evaluate the given function 'input' for a single value of x, or NaN if it is undefined.
+    '''
+    try:
+        return eval(input, globals(), {'x': x})
+    except (TypeError, ValueError, ArithmeticError):
+        return math.nan
+
+def to_real_array(y: numeric, shape: tuple) -> np.ndarray:
+    '''
+    Broadcast the result of a function to the given shape, masking non-real and non-finite values as NaN.
+    '''
+    y = np.asarray(y)
+    if np.iscomplexobj(y):
+        y = np.where(y.imag == 0, y.real, math.nan)
+    try:
+        y = y.astype(float)
+    except (TypeError, ValueError, OverflowError):
+        y = np.array([float(v) if isinstance(v, (int, float)) and abs(v) < sys.float_info.max else math.nan for v in y.ravel()]).reshape(y.shape)
+    y = np.array(np.broadcast_to(y, shape))
+    y[~np.isfinite(y)] = math.nan
+    return y
+
+def plot_funcs(x: np.ndarray, inputs: List[CodeType]) -> np.ndarray:
+    '''
+    Evaluate each of the given functions over the same range x, returning one row of values per function.
+    '''
+    return np.stack([plot_func(x, input) for input in inputs])
+
+def sample_range(formula: str, inputs: List[CodeType], start: float, end: float, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Sample the compiled functions 'inputs' on [start, end] on a shared grid, for a plot of the given size in pixels.
+    Ranges that were sampled before at the same resolution level are taken from the range cache.
+    '''
+    level = math.floor(math.log2((end - start) / width))
+    resolution = 2.0 ** level
+    key = (formula, level)
+    gaps = range_cache.missing(key, start, end)
+    span = None
+    if gaps and (gaps[0][0] > start or gaps[0][1] < end):
+        # Scale the tolerance of newly exposed ranges like the part of the plot that is already cached
+        span = value_span(range_cache.get(key, start, end)[1])
+    for gap_start, gap_end in gaps:
+        pixels = max(round((gap_end - gap_start) / resolution), 1)
+        x, y = adaptive_sample(lambda x: plot_funcs(x, inputs), gap_start, gap_end, pixels, height,
+                               max_points=max(10000 * pixels // width, 100), initial_points=max(65 * pixels // width, 5), span=span)
+        range_cache.add(key, gap_start, gap_end, x, y)
+    return range_cache.get(key, start, end)
+
+def calculate_expression(formula: str, precision: int = None) -> str:
     '''
     Calculates the result of a given mathematical problem.
+    Precision: optional number of significant digits (default: standard floating point)
     Supported operations:
     Basic: +, -, *, /
     Modulus: % or mod
     Powers: ^
     Square roots: sqrt()
-    Factorial: !
+    Factorial: ! (non-integers through the gamma function, huge results are approximated)
     Logarithms: log(,[base]) (default base=e)
     Absolute value: abs()
     Rounding: round(), floor(), ceil()
@@ -407,25 +961,42 @@ def calculate_expression(formula: str) -> str:
     Infinity: inf
     Sum: sum(start, end, f(x)) (start and end inclusive)
     Product: product(start, end, f(x)) (start and end inclusive)
+    In arbitrary precision, alpha, delta, theta and lambda are limited to their tabulated digits.
+    Approximated results (e.g. huge products and infinite series) are shown with ≈ and only the digits they support.
     '''
     formula = formula.strip()
     if not formula:
         raise ValueError(f'Required argument missing: expression.')
+    if precision:
+        precision = validate_precision(precision)
     try:
-        input = format_input(formula.lower(), 0)
-
-        result = calculate(input)
-
-        output = format_output(result)
+        style = 3 if precision else 0
+        with stage('format_input'):
+            input = compile_input(formula.lower(), style)
+        approximation.digits = None
+        with mp.workdps(precision or mp.dps):
+            with stage('eval'):
+                result = calculate(input)
+            with stage('format_output'):
+                digits = approximation.digits
+                if digits is not None and not isinstance(result, str):
+                    # Only show the digits that the approximations support
+                    output = format_precise(mpmath.mpmathify(result), min(digits, precision or digits))
+                else:
+                    output = format_output(result, precision)
         formula = beautify_input(formula)
-        return f'{formula} = {output}'
+        return f'{formula} {"=" if digits is None else "≈"} {output}'
     except Exception as e:
-        raise ValueError(f'Invalid mathematical expression:\n{e}')
+        # Some mpmath errors have no message, e.g. its ZeroDivisionError
+        message = str(e) or ('division by zero' if isinstance(e, ZeroDivisionError) else type(e).__name__)
+        raise ValueError(f'Invalid mathematical expression:\n{message}')
 
-def plot(start: float, end: float, formula: str) -> Tuple[str, str]:
+def plot(start: float, end: float, formula: str, width: int = 1000, height: int = 750, samples: str = '', method: str = 'minmax') -> Tuple[str, PlotData]:
     '''
     Plots a given mathematical function
     Arguments: start, end, f(x)
+    Multiple functions: separate them by ; (e.g. sin(x); cos(x))
+    Samples: optional number of evenly spaced samples for high resolution plots (up to 10^9)
     Supported operations:
     Basic: +, -, *, /
     Modulus: % or mod
@@ -438,47 +1009,94 @@ def plot(start: float, end: float, formula: str) -> Tuple[str, str]:
     Parentheses: ()
     Constants: pi, e, phi, tau, alpha, gamma, delta, theta, lambda, psi, rho
     '''
+    start, end = validate_range(start, end)
+    samples = validate_samples(samples)
     formula = formula.strip()
-    if not is_float(start) or not is_float(end):
-        raise ValueError(f'Invalid argument(s): start/end.')
-    start, end = float(start), float(end)
-    if start >= end:
-        raise ValueError(f'Invalid arguments: start, end.')
     if not formula:
         raise ValueError(f'Required argument missing: formula.')
     try:
-        input = format_input(formula.lower(), 1)
-
-        x = np.linspace(start, end, 250)
-
-        plt.style.use('dark_background')
-        fig, ax = plt.subplots()
-
-        # Set background colour
-        ax.set_facecolor('#464646')
-        fig.patch.set_facecolor('#464646')
+        with stage('format_input'):
+            formulas, inputs = compile_functions(formula)
+
+        with stage('eval'):
+            if samples:
+                # High resolution: reduce the evenly spaced samples per pixel column before they reach matplotlib
+                sample = lttb_sample if method == 'lttb' else minmax_sample
+                x, y = sample(lambda x: plot_funcs(x, inputs), start, end, samples, width)
+            else:
+                x, y = sample_range(';'.join(formulas).lower(), inputs, start, end, width, height)
+        if np.isnan(y).all():
+            raise ValueError('The function is undefined on the given range.')
 
-        val = plot_func(x, input)
-        
-        y = [v for v in val.values()]
+        formula = '; '.join(beautify_input(f) for f in formulas)
+        return (f'𝘧(𝓍) = {formula}', PlotData(start, end, x, y, view_limits(y), tuple(formulas)))
+    except Exception as e:
+        raise ValueError(f'Invalid mathematical expression:\n{e}')
 
-        potential_error = y[len(y)-1]
-        if isinstance(potential_error, Exception):
-            raise potential_error
+def export_plot_samples(start: float, end: float, formula: str, samples: str, file_type: str = '.csv') -> str:
+    '''
+    Writes the raw values of the given function(s) at evenly spaced samples to a .csv or .npy file in the output folder.
+    '''
+    start, end = validate_range(start, end)
+    samples = validate_samples(samples)
+    if not samples:
+        raise ValueError(f'Required argument missing: samples.')
+    if not file_type in ['.csv', '.npy']:
+        raise ValueError('Invalid file type. Please choose between .csv and .npy.')
+    formula = formula.strip()
+    if not formula:
+        raise ValueError(f'Required argument missing: formula.')
+    try:
+        _, inputs = compile_functions(formula)
+    except Exception as e:
+        raise ValueError(f'Invalid mathematical expression:\n{e}')
 
-        plt.plot(x, y, color='#47a0ff')
+    file_name = f'output/samples_{datetime.utcnow().strftime("%Y-%m-%d_%H%M%S%f")}{file_type}'
+    export_samples(lambda x: plot_funcs(x, inputs), start, end, samples, file_name)
+    return f'{samples} samples written to\n{file_name}'
 
-        ax.yaxis.grid()
-        ax.xaxis.grid()
-        plt.xlim(start, end)
-        file_name = f'output/images/plot_{datetime.utcnow().strftime("%Y-%m-%d_%H%M%S%f")}.png'
-        plt.savefig(file_name, facecolor=fig.get_facecolor(), dpi=300)
-        plt.close(fig)
+def validate_range(start: str, end: str) -> Tuple[float, float]:
+    '''
+    Validates the x-range of a plot.
+    '''
+    if not is_float(start) or not is_float(end):
+        raise ValueError(f'Invalid argument(s): start/end.')
+    start, end = float(start), float(end)
+    if start >= end:
+        raise ValueError(f'Invalid arguments: start, end.')
+    return start, end
 
-        formula = beautify_input(formula)
-        return (f'𝘧(𝓍) = {formula}', file_name)
-    except Exception as e:
-        raise ValueError(f'Invalid mathematical expression:\n{e}')
+def parse_range(text: str) -> Tuple[str, float, float]:
+    '''
+    Parses a range of a variable, e.g. 'x = -5..5', into the name of the variable and the start and end of the range.
+    '''
+    name, separator, bounds = text.partition('=')
+    start, dots, end = bounds.partition('..')
+    name = name.strip().lower()
+    if not separator or not dots or not name.isidentifier():
+        raise ValueError(f'Invalid range: {text.strip()}. Please give a range as name = start..end, e.g. x = -5..5.')
+    start, end = validate_range(start.strip(), end.strip())
+    return name, start, end
+
+def validate_samples(samples: str) -> int:
+    '''
+    Validates the optional number of samples of a high resolution plot, returning 0 if none were given.
+    '''
+    samples = str(samples).strip()
+    if not samples:
+        return 0
+    if not is_int(samples) or not 2 <= int(samples) <= 10**9:
+        raise ValueError(f'Invalid argument: samples. Please give a number between 2 and 10^9.')
+    return int(samples)
+
+def compile_functions(formula: str) -> Tuple[List[str], List[CodeType]]:
+    '''
+    Splits a formula into its functions separated by ; and compiles each of them.
+    '''
+    formulas = [f.strip() for f in formula.split(';')]
+    if not all(formulas):
+        raise ValueError('Empty function between \';\'')
+    return formulas, [compile_input(f.lower(), 1) for f in formulas]
 
 def solve(formula: str) -> str:
     '''
@@ -492,38 +1110,125 @@ def solve(formula: str) -> str:
     Constants: pi, e, phi, tau, alpha, gamma, delta, theta, lambda, psi, rho
     Trigonometry: sin(), cos(), tan() (in radians)
     Complex/imaginary numbers: i
+    Interval scanned for numeric roots: add it after a ; (e.g. cos(x) = x; x = -5..5), -10..10 by default
+    Parameter sweep: add a range of a single letter parameter after a ; (e.g. a*x^2 + x = 3; a = 1..10)
     '''
+    formula, _, interval = formula.partition(';')
     formula = formula.strip()
     if not formula:
         raise ValueError(f'Required argument missing: formula.')
+    start = end = None
+    if interval.strip():
+        name, start, end = parse_range(interval)
+        if name != 'x':
+            return solve_sweep(formula, name, start, end)[0]
     try:
-        input = format_input(formula.lower(), 2)
+        with stage('format_input'):
+            input = compile_input(formula.lower(), 2)
 
-        solutions = solve_for_x(input)
+        solutions = solve_for_x(input, start, end)
 
-        if len(solutions) == 0:
-            output = 'False'
-        elif len(solutions) == 1:
-            output = f'𝓍 = {solutions[0]}'.lower()
-        else:
-            output = ''
-            for i, sol in enumerate(solutions):
-                if not i == 0:
-                    output += ' ∨ '
-                output += f'𝓍 = {sol}'.lower()
-
-        output = output.replace('pi', 'π')
-        output = output.replace('i', '𝑖')
-        output = output.replace('exp', 'EXP')
-        output = output.replace('x', '𝓍')
-        output = output.replace('EXP', 'exp')
-        output = output.replace('sqrt', '√')
+        with stage('format_output'):
+            output = format_solutions(solutions)
         formula = beautify_input(formula)
         
         return f'{output}'
     except Exception as e:
         raise ValueError(f'Invalid mathematical expression:\n{e}')
 
+def format_solutions(solutions: list) -> str:
+    '''
+    Formats solutions for x as 𝓍 = a ∨ 𝓍 = b, or False if there are none.
+    '''
+    if len(solutions) == 0:
+        output = 'False'
+    elif len(solutions) == 1:
+        output = f'𝓍 = {solutions[0]}'.lower()
+    else:
+        output = ''
+        for i, sol in enumerate(solutions):
+            if not i == 0:
+                output += ' ∨ '
+            output += f'𝓍 = {sol}'.lower()
+
+    output = output.replace('pi', 'π')
+    output = output.replace('i', '𝑖')
+    output = output.replace('exp', 'EXP')
+    output = output.replace('x', '𝓍')
+    output = output.replace('EXP', 'exp')
+    output = output.replace('sqrt', '√')
+    return output
+
+def solve_sweep(formula: str, parameter: str, start: float, end: float, samples: int = sweep_samples, export: bool = True) -> Tuple[str, Optional[PlotData]]:
+    '''
+    Solves an equation with one parameter for x over evenly spaced values of the parameter on [start, end].
+    The equation is solved symbolically once, and the solution branches are evaluated for all values in one vectorized call.
+    If export is True, the values are written to a .csv file in the output folder. Returns a summary with a table of
+    some of the values, and the real values of each branch against the parameter as plot data (None without solutions).
+    '''
+    if len(parameter) != 1 or parameter in 'xei':
+        raise ValueError(f'Invalid parameter: {parameter}. Please use a single letter other than x, e and i.')
+    try:
+        with stage('format_input'):
+            formatted = compile_input(formula.lower(), 2, parameters=(parameter,))
+            inputs = split_equation(formatted)
+            equation = sympy.sympify(f'Eq({inputs[0]}, {inputs[1]})')
+
+        x, symbol = sympy.Symbol('x'), sympy.Symbol(parameter)
+        def solve_branches() -> Tuple[List[sympy.Expr], bool]:
+            with stage('sympy'):
+                try:
+                    return solve_symbolic(equation, x).result(timeout=solve_time_budget), True
+                except TimeoutError:
+                    raise ValueError(f'Could not solve for x within {solve_time_budget} seconds.')
+        branches = cached_solutions(f'{normalize_equation(formatted)};{parameter}', solve_branches)
+        if not branches:
+            poly = equation.lhs - equation.rhs
+            if poly.is_polynomial(x) and sympy.degree(poly, x) >= polynomial_degree:
+                raise ValueError(f'There is no closed form solution for x in terms of {parameter}.')
+            return 'False', None
+        branches = [branch.evalf(15) if branch.has(sympy.Float) else branch for branch in branches]
+
+        with stage('eval'):
+            values = np.linspace(start, end, samples)
+            with np.errstate(all='ignore'):
+                results = sympy.lambdify(symbol, branches, 'numpy')(values.astype(complex))
+            columns = [np.array(np.broadcast_to(np.asarray(result, dtype=complex), values.shape)) for result in results]
+    except Exception as e:
+        raise ValueError(f'Invalid mathematical expression:\n{e}')
+
+    with stage('format_output'):
+        if export:
+            file_name = f'output/sweep_{datetime.utcnow().strftime("%Y-%m-%d_%H%M%S%f")}.csv'
+            with open(file_name, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow([parameter] + [f'x{i+1}' for i in range(len(columns))])
+                for i, value in enumerate(values):
+                    writer.writerow([repr(float(value))] + [format_sweep_value(column[i], repr) for column in columns])
+
+        rows = np.unique(np.linspace(0, samples - 1, min(sweep_table_rows, samples)).round().astype(int))
+        table = [[parameter] + [f'𝓍{i+1}' for i in range(len(columns))]]
+        table += [[f'{values[i]:.6g}'] + [format_sweep_value(column[i], lambda v: f'{v:.6g}') for column in columns] for i in rows]
+        widths = [max(len(row[j]) for row in table) for j in range(len(table[0]))]
+        output = format_solutions(branches) + '\n\n' + '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in table)
+        if export:
+            output += f'\n\n{samples} values of {parameter} written to\n{file_name}'
+
+        real = np.array([np.where(np.abs(column.imag) <= 1e-12 * np.maximum(1, np.abs(column.real)), column.real, math.nan) for column in columns])
+        labels = tuple(f'x{i+1}' for i in range(len(columns)))
+        return output, PlotData(start, end, values, real, view_limits(real), labels)
+
+def format_sweep_value(value: complex, format: Callable[[float], str]) -> str:
+    '''
+    Formats a value of a solution branch, leaving it empty if the branch is undefined for that parameter value.
+    '''
+    if not cmath.isfinite(value):
+        return ''
+    value += 0.0 # no negative zeros
+    if abs(value.imag) <= 1e-12 * max(1, abs(value.real)):
+        return format(float(value.real))
+    return f'{format(float(value.real))}{"+" if value.imag >= 0 else "-"}{format(abs(float(value.imag)))}i'
+
 def convert(value='', unit='', new_unit='') -> str:
     '''
     Converts given unit to new unit.
@@ -581,6 +1286,8 @@ def convert(value='', unit='', new_unit='') -> str:
                         else:
                             raise ValueError(f'Incompatible units: {unit}, {new_unit}.')
 
+    if isinstance(factor, CurrencyRate):
+        factor = get_currency_rate(factor.input, factor.output)
     if isinstance(factor, int) or isinstance(factor, float):
         new_value = value * factor
     else:
@@ -686,7 +1393,8 @@ def get_random_primes(num: str, file_type: str, input: str) -> str:
     start = int('1' + '0'*(length-1))
     end = int('1' + '0'*(length))
 
-    primes = [sympy.randprime(start, end) for _ in range(num)]
+    with stage('sympy'):
+        primes = [sympy.randprime(start, end) for _ in range(num)]
 
     if num > 1:
         file_name = f'output/primes_{datetime.utcnow().strftime("%Y-%m-%d_%H%M%S%f")}{file_type}'
@@ -708,7 +1416,8 @@ def prime_factorization(input: str) -> str:
         raise ValueError('Invalid input. Please give a number literal as argument.')
     input = int(input)
 
-    factors = sympy.factorint(input)
+    with stage('sympy'):
+        factors = sympy.factorint(input)
 
     output = ' • '.join([str(factor) + (f'^{factors[factor]}' if factors[factor] > 1 else '') for factor in factors])
 
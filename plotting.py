@@ -0,0 +1,65 @@
+import io
+from typing import Tuple
+from datetime import datetime
+import numpy as np
+from matplotlib import style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from sampling import PlotData
+from instrumentation import stage
+
+background_colour = '#464646'
+line_colours = ['#47a0ff', '#ff9f43', '#2ed573', '#ff6b81', '#eccc68', '#a29bfe']
+
+
+def create_figure(data: PlotData, width: int, height: int, dpi: int = 100) -> Figure:
+    '''
+    Creates a figure of the given size in pixels for the plot data.
+    '''
+    with stage('render'), style.context('dark_background'):
+        fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor=background_colour)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.set_facecolor(background_colour)
+        for i, y in enumerate(data.y):
+            label = data.labels[i] if i < len(data.labels) else None
+            ax.plot(data.x, y, color=line_colours[i % len(line_colours)], label=label)
+        if len(data.y) > 1:
+            ax.legend(facecolor=background_colour)
+        ax.yaxis.grid()
+        ax.xaxis.grid()
+        ax.set_xlim(data.start, data.end)
+        if data.limits:
+            ax.set_ylim(*data.limits)
+        # Draw inside the style context, so that the style also applies to lazily created artists
+        fig.canvas.draw()
+    return fig
+
+def render_rgba(data: PlotData, width: int, height: int) -> Tuple[np.ndarray, Tuple[float, float]]:
+    '''
+    Renders the plot at the given size in pixels, returning the RGBA pixel buffer with shape (height, width, 4),
+    and the horizontal pixel extent (left, right) of the axes.
+    '''
+    fig = create_figure(data, width, height)
+    left, _, right, _ = fig.axes[0].bbox.extents
+    return np.asarray(fig.canvas.buffer_rgba()), (left, right)
+
+def render_bytes(data: PlotData, format: str = 'png', width: int = 640, height: int = 480) -> bytes:
+    '''
+    Renders the plot at the given size in pixels to an image file in memory, e.g. png or svg.
+    '''
+    fig = create_figure(data, width, height)
+    buffer = io.BytesIO()
+    with stage('savefig'):
+        fig.savefig(buffer, format=format, facecolor=fig.get_facecolor())
+    return buffer.getvalue()
+
+def export_plot(data: PlotData, dpi: int = 300) -> str:
+    '''
+    Saves the plot as a png image in the output folder and returns its path.
+    '''
+    file_name = f'output/images/plot_{datetime.utcnow().strftime("%Y-%m-%d_%H%M%S%f")}.png'
+    fig = create_figure(data, 640, 480)
+    with stage('savefig'):
+        fig.savefig(file_name, facecolor=fig.get_facecolor(), dpi=dpi)
+    return file_name
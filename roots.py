@@ -0,0 +1,166 @@
+from __future__ import annotations
+from typing import Callable, List, Optional
+import math
+import sys
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Number of grid points on which an interval is scanned for sign changes and near-zeros
+grid_samples = 10001
+# Maximum number of iterations of Brent's method and Newton's method
+max_iterations = 100
+# Largest |f(x)| at which a point that is not bracketed by a sign change is accepted as a root
+near_zero_tolerance = 1e-10
+# Relative distance below which two roots are considered equal
+duplicate_tolerance = 1e-9
+# Number of starting points along each axis of the complex plane for Newton's method
+complex_seeds = 16
+# Number of Newton steps that polish the eigenvalue roots of a polynomial
+polish_steps = 3
+
+
+def evaluate(f: Callable, x: np.ndarray) -> np.ndarray:
+    '''
+    Evaluates the vectorized function f at x, masking undefined values, and values that are not real for real x, as NaN.
+    '''
+    with np.errstate(all='ignore'):
+        try:
+            y = np.asarray(f(x))
+        except (TypeError, ValueError, ArithmeticError):
+            return np.full(np.shape(x), math.nan)
+        y = np.array(np.broadcast_to(y, np.shape(x)))
+        if np.iscomplexobj(y) and not np.iscomplexobj(x):
+            y = np.where(np.abs(y.imag) <= 1e-12 * np.maximum(1, np.abs(y.real)), y.real, math.nan)
+        y[~np.isfinite(y)] = math.nan
+        return y
+
+def real_roots(f: Callable, df: Optional[Callable], start: float, end: float, samples: int = grid_samples) -> List[float]:
+    '''
+    Finds the real roots of the vectorized function f on [start, end].
+    The interval is scanned on a grid: each sign change is refined with Brent's method,
+    and each local minimum of |f| that is not bracketed (e.g. a double root) is refined with Newton's method using df.
+    Sign changes across a pole are discarded, because |f| grows instead of shrinking.
+    '''
+    x = np.linspace(start, end, samples)
+    y = evaluate(f, x).astype(float)
+    roots = list(x[y == 0])
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        brackets = np.flatnonzero(y[:-1] * y[1:] < 0)
+    for i in brackets:
+        root, value = brent(f, x[i], x[i+1], y[i], y[i+1])
+        if abs(value) < min(abs(y[i]), abs(y[i+1])):
+            roots.append(root)
+
+    if df is not None:
+        magnitude = np.abs(y)
+        with np.errstate(invalid='ignore', over='ignore'):
+            minima = np.flatnonzero((magnitude[1:-1] <= magnitude[:-2]) & (magnitude[1:-1] <= magnitude[2:]) & (y[:-2] * y[2:] > 0)) + 1
+        if minima.size:
+            candidates = np.real(newton(f, df, x[minima]))
+            values = np.abs(evaluate(f, candidates))
+            roots += list(candidates[(values <= near_zero_tolerance) & (candidates >= start) & (candidates <= end)])
+    return unique_roots(roots)
+
+def complex_roots(f: Callable, df: Callable, start: float, end: float, seeds: int = complex_seeds) -> List[complex]:
+    '''
+    Finds complex roots of the vectorized function f with Newton's method,
+    starting from a grid of points with real parts in [start, end] and imaginary parts of similar size.
+    Only roots inside this search area are returned.
+    '''
+    height = (end - start) / 2
+    real, imag = np.meshgrid(np.linspace(start, end, seeds), np.linspace(-height, height, seeds))
+    candidates = newton(f, df, (real + 1j * imag).ravel())
+    with np.errstate(all='ignore'):
+        values = np.abs(np.asarray(f(candidates), dtype=complex))
+    inside = (candidates.real >= start) & (candidates.real <= end) & (np.abs(candidates.imag) <= height)
+    found = candidates[inside & np.isfinite(values) & (values <= near_zero_tolerance)]
+    return unique_roots([complex(z) if abs(z.imag) > duplicate_tolerance * max(1, abs(z)) else float(z.real) for z in found])
+
+def polynomial_roots(coefficients: list) -> list:
+    '''
+    Finds all roots of the polynomial with the given coefficients (highest power first) as the eigenvalues
+    of its companion matrix, polished by a few Newton steps that are only kept where they reduce |p(z)|.
+    Roots with a negligible imaginary part are returned as real numbers.
+    '''
+    coefficients = np.real_if_close(np.asarray(coefficients, dtype=complex))
+    derivative = np.polyder(coefficients)
+    z = np.roots(coefficients).astype(complex)
+    with np.errstate(all='ignore'):
+        value = np.abs(np.polyval(coefficients, z))
+        for _ in range(polish_steps):
+            polished = z - np.polyval(coefficients, z) / np.polyval(derivative, z)
+            polished_value = np.abs(np.polyval(coefficients, polished))
+            better = np.isfinite(polished) & (polished_value < value)
+            z, value = np.where(better, polished, z), np.where(better, polished_value, value)
+    return [float(root.real) if abs(root.imag) <= duplicate_tolerance * max(1, abs(root)) else complex(root) for root in z]
+
+def brent(f: Callable, a: float, b: float, fa: float, fb: float, tolerance: float = 4 * sys.float_info.epsilon) -> tuple:
+    '''
+    Refines a root of f bracketed by [a, b], where f(a) and f(b) have opposite signs, with Brent's method.
+    Returns the root and the value of f at the root.
+    '''
+    a, b, fa, fb = float(a), float(b), float(fa), float(fb)
+    c, fc = a, fa
+    d = e = b - a
+    for _ in range(max_iterations):
+        if fb * fc > 0:
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2 * tolerance * abs(b) + tolerance
+        m = (c - b) / 2
+        if abs(m) <= tol or fb == 0:
+            break
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            # Inverse quadratic interpolation, or the secant method if only two points are distinct
+            s = fb / fa
+            if a == c:
+                p, q = 2 * m * s, 1 - s
+            else:
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, m)
+        fb = float(evaluate(f, np.array([b]))[0])
+        if math.isnan(fb):
+            break
+    return b, fb
+
+def newton(f: Callable, df: Callable, z: np.ndarray) -> np.ndarray:
+    '''
+    Runs Newton's method from all starting points z at once, which may be real or complex.
+    Points where f or df is undefined stop moving.
+    '''
+    z = np.array(z)
+    with np.errstate(all='ignore'):
+        for _ in range(max_iterations):
+            step = np.asarray(f(z)) / np.asarray(df(z))
+            step = np.where(np.isfinite(step), step, 0)
+            z = z - step
+            if np.all(np.abs(step) <= duplicate_tolerance * 1e-3 * np.maximum(1, np.abs(z))):
+                break
+    return z
+
+def unique_roots(roots: list) -> list:
+    '''
+    Sorts the roots, and removes roots that are equal to a previous root up to the duplicate tolerance.
+    '''
+    unique = []
+    for root in sorted(roots, key=lambda z: (complex(z).real, complex(z).imag)):
+        if not any(abs(root - other) <= duplicate_tolerance * max(1, abs(root)) for other in unique):
+            unique.append(root.item() if hasattr(root, 'item') else root)
+    return unique
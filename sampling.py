@@ -0,0 +1,317 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+import math
+from lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+class PlotData(NamedTuple):
+    '''
+    Sampled function values of a plot, from which the figure can be rendered at any size.
+    y holds one row of values per function, labels holds one label per function.
+    '''
+    start: float
+    end: float
+    x: np.ndarray
+    y: np.ndarray
+    limits: Optional[Tuple[float, float]] = None
+    labels: Tuple[str, ...] = ()
+
+
+def value_span(y: np.ndarray) -> Tuple[float, float]:
+    '''
+    Gets a robust range of the finite values in y, ignoring outliers such as values near poles.
+    '''
+    finite = y[np.isfinite(y)]
+    if finite.size == 0:
+        return (-1.0, 1.0)
+    low, high = np.percentile(finite, [2, 98])
+    if high - low <= 0:
+        low, high = float(finite.min()), float(finite.max())
+    if high - low <= 0:
+        padding = max(abs(high), 1.0)
+        low, high = low - padding, high + padding
+    return (float(low), float(high))
+
+def view_limits(y: np.ndarray) -> Optional[Tuple[float, float]]:
+    '''
+    Gets y-axis limits that exclude runaway values (e.g. near poles), or None if autoscaling is fine.
+    '''
+    finite = y[np.isfinite(y)]
+    if finite.size == 0:
+        return None
+    low, high = np.percentile(finite, [1, 99])
+    if high - low <= 0 or finite.max() - finite.min() <= 10 * (high - low):
+        return None
+    padding = (high - low) * 0.1
+    return (float(low - padding), float(high + padding))
+
+def adaptive_sample(f: Callable[[np.ndarray], np.ndarray], start: float, end: float, width: int = 1000, height: int = 750,
+                    tolerance: float = 0.5, max_points: int = 10000, initial_points: int = 65,
+                    span: Optional[Tuple[float, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Sample the vectorized function f on [start, end], refining intervals until the plotted line is within
+    the given tolerance (in pixels) of the function, or the point budget is used up.
+    f may return a single row of values, or one row per function for several functions on a shared grid.
+    Intervals are refined on curvature (distance of the midpoint to the chord), sign flips across a pole,
+    and undefined points. Detected discontinuities are split by a NaN, so no vertical line is drawn.
+    The y-range that maps to the given height is estimated from the initial grid, unless a span is given.
+    '''
+    x = np.linspace(start, end, initial_points)
+    y = f(x)
+    single = y.ndim == 1
+    y = np.atleast_2d(y)
+    low, high = span if span else value_span(y)
+    scale_y = height / (high - low)
+    min_dx = (end - start) / width / 8
+    jump = max(2.0, 4 * tolerance)
+
+    active = np.ones(len(x) - 1, dtype=bool)
+    unresolved = np.zeros(len(x) - 1, dtype=bool)
+    while active.any():
+        index = np.flatnonzero(active)
+        x_left, x_right = x[index], x[index+1]
+        y_left, y_right = y[:, index], y[:, index+1]
+        x_mid = (x_left + x_right) / 2
+        y_mid = np.atleast_2d(f(x_mid))
+
+        with np.errstate(invalid='ignore', over='ignore'):
+            # Largest deviation over all functions, ignoring functions that are undefined here
+            deviation = np.fmax.reduce(np.abs(y_mid - (y_left + y_right) / 2) * scale_y, axis=0)
+            step = np.abs(y_right - y_left) * scale_y
+            refine = deviation > tolerance
+            between = (np.minimum(y_left, y_right) <= y_mid) & (y_mid <= np.maximum(y_left, y_right))
+            refine |= ((np.sign(y_left) != np.sign(y_right)) & (step > jump) & ~between).any(axis=0)
+        undefined = np.isnan(np.stack([y_left, y_mid, y_right]))
+        refine |= (undefined.any(axis=0) & ~undefined.all(axis=0)).any(axis=0)
+
+        too_small = (x_right - x_left) <= min_dx
+        unresolved[index[refine & too_small]] = True
+        refine &= ~too_small
+
+        budget = max(max_points - len(x), 0)
+        if np.count_nonzero(refine) > budget:
+            # Spend the remaining budget on the intervals with the largest errors
+            candidates = np.flatnonzero(refine)
+            order = np.argsort(-np.nan_to_num(deviation[candidates], nan=np.inf), kind='stable')
+            refine[:] = False
+            refine[np.sort(candidates[order[:budget]])] = True
+            unresolved[index[~refine & (deviation > tolerance)]] = True
+        if not refine.any():
+            break
+
+        split = index[refine]
+        shift = np.searchsorted(split, np.arange(len(x) - 1), side='left')
+        x = np.insert(x, split + 1, x_mid[refine])
+        y = np.insert(y, split + 1, y_mid[:, refine], axis=1)
+
+        new_unresolved = np.zeros(len(x) - 1, dtype=bool)
+        new_unresolved[np.arange(len(unresolved)) + shift] = unresolved
+        unresolved = new_unresolved
+        active = np.zeros(len(x) - 1, dtype=bool)
+        first = split + np.arange(len(split))
+        active[first] = True
+        active[first + 1] = True
+
+    with np.errstate(invalid='ignore'):
+        # A discontinuity is an unresolved interval with a large jump that is steeper than its neighbours,
+        # so that steep but continuous stretches next to a pole are still drawn
+        step = np.nan_to_num(np.abs(np.diff(y, axis=1)) * scale_y, nan=0.0)
+        padded = np.pad(step, ((0, 0), (1, 1)))
+        steepest = (step >= padded[:, :-2]) & (step >= padded[:, 2:])
+        jumps = unresolved & (step > jump) & steepest
+    breaks = np.flatnonzero(jumps.any(axis=0))
+    if breaks.size:
+        # Break the lines of the functions that jump, and continue the others along their chord
+        y_break = (y[:, breaks] + y[:, breaks+1]) / 2
+        y_break[jumps[:, breaks]] = math.nan
+        x = np.insert(x, breaks + 1, (x[breaks] + x[breaks+1]) / 2)
+        y = np.insert(y, breaks + 1, y_break, axis=1)
+    return x, y[0] if single else y
+
+
+class Segment(NamedTuple):
+    start: float
+    end: float
+    x: np.ndarray
+    y: np.ndarray
+
+
+class RangeCache:
+    '''
+    Cache of sampled function values per key (e.g. formula and resolution), stored as sorted, merged
+    x-ranges. The least recently used keys are evicted when the cached arrays exceed the memory budget.
+    '''
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self._segments = OrderedDict()
+        self._nbytes = 0
+        self.max_bytes = max_bytes
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def missing(self, key: Hashable, start: float, end: float) -> List[Tuple[float, float]]:
+        '''
+        Gets the parts of [start, end] that are not yet cached for the given key.
+        '''
+        gaps = []
+        position = start
+        for segment in self._segments.get(key, []):
+            if segment.end <= position:
+                continue
+            if segment.start >= end:
+                break
+            if segment.start > position:
+                gaps.append((position, segment.start))
+            position = segment.end
+            if position >= end:
+                break
+        if position < end:
+            gaps.append((position, end))
+        return gaps
+
+    def add(self, key: Hashable, start: float, end: float, x: np.ndarray, y: np.ndarray):
+        '''
+        Adds sampled values for the range [start, end], merging them with overlapping or adjacent ranges.
+        '''
+        segments = self._segments.pop(key, [])
+        self._nbytes -= sum(segment.x.nbytes + segment.y.nbytes for segment in segments)
+        merged = []
+        for segment in segments:
+            if segment.end < start or segment.start > end:
+                merged.append(segment)
+                continue
+            # Keep the existing points outside the new range
+            before = segment.x < start
+            after = segment.x > end
+            x = np.concatenate([segment.x[before], x, segment.x[after]])
+            y = np.concatenate([segment.y[..., before], y, segment.y[..., after]], axis=-1)
+            start, end = min(start, segment.start), max(end, segment.end)
+        merged.append(Segment(start, end, x, y))
+        merged.sort(key=lambda segment: segment.start)
+
+        self._segments[key] = merged
+        self._nbytes += sum(segment.x.nbytes + segment.y.nbytes for segment in merged)
+        while self._nbytes > self.max_bytes and len(self._segments) > 1:
+            _, evicted = self._segments.popitem(last=False)
+            self._nbytes -= sum(segment.x.nbytes + segment.y.nbytes for segment in evicted)
+
+    def get(self, key: Hashable, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Gets the cached values for [start, end], including the nearest point on either side,
+        so that the plotted line reaches the edges of the range.
+        '''
+        self._segments.move_to_end(key)
+        xs, ys = [], []
+        for segment in self._segments[key]:
+            if segment.end < start or segment.start > end:
+                continue
+            first = max(np.searchsorted(segment.x, start, side='right') - 1, 0)
+            last = np.searchsorted(segment.x, end, side='left') + 1
+            xs.append(segment.x[first:last])
+            ys.append(segment.y[..., first:last])
+        return np.concatenate(xs), np.concatenate(ys, axis=-1)
+
+    def clear(self):
+        self._segments.clear()
+        self._nbytes = 0
+
+
+def chunks(start: float, end: float, samples: int, chunk_size: int) -> Iterator[np.ndarray]:
+    '''
+    Generates the evenly spaced x values of [start, end] in chunks of at most chunk_size values.
+    '''
+    step = (end - start) / (samples - 1)
+    for first in range(0, samples, chunk_size):
+        x = start + np.arange(first, min(first + chunk_size, samples)) * step
+        x[x > end] = end
+        yield x
+
+def minmax_sample(f: Callable[[np.ndarray], np.ndarray], start: float, end: float, samples: int, pixels: int,
+                  chunk_size: int = 2**18) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Evaluate f on a uniform grid of the given number of samples, in chunks to bound memory, and reduce
+    the values to a minimum/maximum envelope per pixel column.
+    Returns two points per pixel column, so the plotted line covers every value in that column.
+    Up to two samples per pixel column are returned as they are, as columns without samples would break the line.
+    '''
+    if samples <= 2 * pixels:
+        x = next(chunks(start, end, samples, samples))
+        return x, np.atleast_2d(f(x))
+    low, high = None, None
+    for x in chunks(start, end, samples, chunk_size):
+        y = np.atleast_2d(f(x))
+        if low is None:
+            low = np.full((len(y), pixels), np.nan)
+            high = np.full((len(y), pixels), np.nan)
+        columns = np.minimum(((x - start) / (end - start) * pixels).astype(int), pixels - 1)
+        # x is sorted, so each column is a contiguous run of the chunk
+        runs = np.concatenate([[0], np.flatnonzero(np.diff(columns)) + 1])
+        run_columns = columns[runs]
+        low[:, run_columns] = np.fmin(low[:, run_columns], np.fmin.reduceat(y, runs, axis=1))
+        high[:, run_columns] = np.fmax(high[:, run_columns], np.fmax.reduceat(y, runs, axis=1))
+
+    centers = start + (np.arange(pixels) + 0.5) * (end - start) / pixels
+    x = np.repeat(centers, 2)
+    y = np.stack([low, high], axis=-1).reshape(len(low), 2 * pixels)
+    return x, y
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Downsample a line to the given number of points with the largest triangle three buckets algorithm,
+    which keeps the points that contribute most to the visual shape of the line.
+    y may hold several rows, in which case the triangle areas are summed over the rows.
+    '''
+    y = np.atleast_2d(y)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    y_filled = np.nan_to_num(y)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        first, last = edges[bucket], edges[bucket + 1]
+        next_first, next_last = last, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        average_x = x[next_first:max(next_last, next_first + 1)].mean()
+        average_y = y_filled[:, next_first:max(next_last, next_first + 1)].mean(axis=1)
+        area = np.abs((x[previous] - average_x) * (y_filled[:, first:last] - y_filled[:, [previous]])
+                      - (x[previous] - x[first:last]) * (average_y[:, None] - y_filled[:, [previous]])).sum(axis=0)
+        previous = first + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return x[selected], y[:, selected]
+
+def lttb_sample(f: Callable[[np.ndarray], np.ndarray], start: float, end: float, samples: int, pixels: int,
+                chunk_size: int = 2**18) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Evaluate f on a uniform grid of the given number of samples, in chunks to bound memory, and downsample
+    each chunk with LTTB to about two points per pixel column.
+    '''
+    xs, ys = [], []
+    for x in chunks(start, end, samples, chunk_size):
+        threshold = max(math.ceil(2 * pixels * len(x) / samples), 3)
+        x, y = lttb(x, f(x), threshold)
+        xs.append(x)
+        ys.append(y)
+    return np.concatenate(xs), np.concatenate(ys, axis=1)
+
+def export_samples(f: Callable[[np.ndarray], np.ndarray], start: float, end: float, samples: int, file_name: str,
+                   chunk_size: int = 2**18):
+    '''
+    Evaluate f on a uniform grid of the given number of samples and stream the raw values to a .csv or .npy file,
+    one row per sample with x followed by the value of each function.
+    '''
+    with open(file_name, 'wb') as file:
+        for i, x in enumerate(chunks(start, end, samples, chunk_size)):
+            rows = np.column_stack([x, np.atleast_2d(f(x)).T])
+            if file_name.endswith('.npy'):
+                if i == 0:
+                    header = {'descr': np.lib.format.dtype_to_descr(rows.dtype), 'fortran_order': False, 'shape': (samples, rows.shape[1])}
+                    np.lib.format.write_array_header_1_0(file, header)
+                file.write(rows.tobytes())
+            else:
+                np.savetxt(file, rows, delimiter=',', fmt='%.17g')
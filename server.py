@@ -0,0 +1,244 @@
+import argparse
+import json
+import math
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Tuple
+from mathematics import calculate_expression, plot, solve, solve_sweep, parse_range, convert, scientific, prime_factorization
+from workers import WorkerPool, default_timeout
+from cache import LRUCache
+from lazy import lazy_import
+import instrumentation
+from utils import is_int
+
+plotting = lazy_import('plotting')
+
+# Interval in seconds at which the results of worker processes are polled
+poll_interval = 0.005
+# Default maximum number of requests that are queued or running at once
+default_queue_size = 64
+
+image_types = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# Range of the width and height of rendered images in pixels
+min_image_size = 16
+max_image_size = 4096
+
+
+def plot_image(start: str, end: str, formula: str, width: int = 640, height: int = 480, samples: str = '', format: str = 'png') -> bytes:
+    '''
+    Plots the given function(s) and renders the plot to an image file in memory.
+    '''
+    validate_image_format(format)
+    width, height = validate_image_size(width, height)
+    _, data = plot(start, end, formula, width, height, samples)
+    return plotting.render_bytes(data, format, width, height)
+
+def sweep_image(equation: str, width: int = 640, height: int = 480, format: str = 'png') -> bytes:
+    '''
+    Solves an equation with a swept parameter, e.g. a*x^2 + x = 3; a = 1..10, and plots x against the parameter.
+    '''
+    validate_image_format(format)
+    width, height = validate_image_size(width, height)
+    formula, _, sweep = equation.partition(';')
+    parameter, start, end = parse_range(sweep)
+    _, data = solve_sweep(formula, parameter, start, end, export=False)
+    if data is None:
+        raise ValueError('The equation has no solutions for x.')
+    return plotting.render_bytes(data, format, width, height)
+
+def validate_image_format(format: str):
+    if format not in image_types:
+        raise ValueError(f'Invalid image format: {format}. Please use one of: {", ".join(image_types)}.')
+
+def validate_image_size(width: str, height: str) -> Tuple[int, int]:
+    '''
+    Validates the width and height of an image in pixels.
+    '''
+    for name, size in (('width', width), ('height', height)):
+        if not is_int(str(size)) or not min_image_size <= int(size) <= max_image_size:
+            raise ValueError(f'Invalid argument: {name}. Please give a number of pixels between {min_image_size} and {max_image_size}.')
+    return int(width), int(height)
+
+def validate_timeout(timeout: str, limit: float) -> float:
+    '''
+    Validates the time budget of a request in seconds, which is capped at the limit of the server.
+    '''
+    try:
+        timeout = float(timeout)
+    except (TypeError, ValueError):
+        timeout = math.nan
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError('Invalid argument: timeout. Please give a number of seconds above 0.')
+    return min(timeout, limit)
+
+# Endpoints with their function, required arguments, and optional arguments with their default values
+endpoints = {
+    '/calculate': (calculate_expression, ['expression'], {'precision': None}),
+    '/solve': (solve, ['equation'], {}),
+    '/convert': (convert, ['value', 'unit', 'new_unit'], {}),
+    '/scientific': (scientific, ['value'], {}),
+    '/factor': (prime_factorization, ['number'], {}),
+    '/plot': (plot_image, ['start', 'end', 'function'], {'width': 640, 'height': 480, 'samples': '', 'format': 'png'}),
+    '/sweep': (sweep_image, ['equation'], {'width': 640, 'height': 480, 'format': 'png'})
+}
+# Endpoints whose responses only depend on their arguments, which are kept in the response cache
+cached_endpoints = {'/calculate', '/solve', '/scientific', '/factor', '/plot', '/sweep'}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class PoolExecutor:
+    '''
+    Thread-safe front end of a worker pool, which resolves a future per request from a polling thread.
+    The number of requests that are queued or running at once is bounded by max_queue.
+    '''
+    def __init__(self, pool: WorkerPool, max_queue: int = default_queue_size):
+        self.pool = pool
+        self.max_queue = max_queue
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, function: Callable, *args, timeout: float = None) -> Future:
+        with self.lock:
+            if len(self.futures) >= self.max_queue:
+                raise QueueFullError('Too many requests. Please try again later.')
+            future = Future()
+            self.futures[self.pool.submit(function, *args, timeout=timeout)] = future
+        return future
+
+    def run(self):
+        while True:
+            with self.lock:
+                finished = self.pool.poll()
+                futures = [(self.futures.pop(request_id, None), success, result) for request_id, success, result in finished]
+            for future, success, result in futures:
+                if future is None:
+                    continue
+                if success:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+            time.sleep(poll_interval)
+
+
+class MathServer(ThreadingHTTPServer):
+    '''
+    HTTP server exposing the math engine as JSON endpoints, evaluated by a pool of worker processes.
+    '''
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], workers: int = 2, timeout: float = default_timeout,
+                 max_queue: int = default_queue_size, cache_size: int = 1024):
+        super().__init__(address, RequestHandler)
+        self.timeout_limit = timeout
+        self.pool = WorkerPool(size=workers, timeout=timeout)
+        self.executor = PoolExecutor(self.pool, max_queue)
+        self.cache = LRUCache(maxsize=cache_size)
+        self.cache_lock = threading.Lock()
+
+    def server_close(self):
+        super().server_close()
+        with self.executor.lock:
+            self.pool.shutdown()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    '''
+    Handles POST requests with a JSON object of arguments per endpoint, e.g. POST /calculate {"expression": "1+1"}.
+    Responses are JSON objects with either a result or an error, or image bytes for plots.
+    '''
+    server: MathServer
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            return self.send_bytes(200, instrumentation.export_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+        if self.path != '/':
+            return self.send_json(404, {'error': f'Unknown endpoint: {self.path}'})
+        self.send_json(200, {
+            'endpoints': {path: {'required': required, 'optional': optional} for path, (_, required, optional) in endpoints.items()},
+            'cache': self.server.cache.info()
+        })
+
+    def do_POST(self):
+        if self.path not in endpoints:
+            return self.send_json(404, {'error': f'Unknown endpoint: {self.path}'})
+        function, required, optional = endpoints[self.path]
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            arguments = json.loads(self.rfile.read(length) or '{}')
+            if not isinstance(arguments, dict):
+                raise ValueError('The request body must be a JSON object.')
+            missing = [name for name in required if name not in arguments]
+            if missing:
+                raise ValueError(f'Required argument(s) missing: {", ".join(missing)}.')
+            args = [str(arguments[name]) for name in required]
+            args += [arguments.get(name, default) for name, default in optional.items()]
+            timeout = validate_timeout(arguments.get('timeout', self.server.timeout_limit), self.server.timeout_limit)
+        except ValueError as e:
+            return self.send_json(400, {'error': str(e)})
+
+        key = (self.path, json.dumps(args))
+        with self.server.cache_lock:
+            result = self.server.cache.get(key)
+        if result is None:
+            try:
+                result = self.server.executor.submit(function, *args, timeout=timeout).result()
+            except QueueFullError as e:
+                return self.send_json(503, {'error': str(e)})
+            except TimeoutError as e:
+                return self.send_json(504, {'error': str(e)})
+            except (ValueError, ArithmeticError) as e:
+                return self.send_json(400, {'error': str(e)})
+            except Exception as e:
+                return self.send_json(500, {'error': str(e)})
+            if self.path in cached_endpoints:
+                with self.server.cache_lock:
+                    self.server.cache.put(key, result)
+
+        if isinstance(result, bytes):
+            return self.send_bytes(200, result, image_types[arguments.get('format', 'png')])
+        self.send_json(200, {'result': result.strip()})
+
+    def send_json(self, status: int, content: dict):
+        self.send_bytes(status, json.dumps(content, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def send_bytes(self, status: int, content: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the math engine as JSON endpoints on a local HTTP server.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on (default: 8000)')
+    parser.add_argument('--workers', type=int, default=2, help='number of worker processes (default: 2)')
+    parser.add_argument('--timeout', type=float, default=default_timeout, help=f'maximum time per request in seconds (default: {default_timeout})')
+    parser.add_argument('--queue', type=int, default=default_queue_size, help=f'maximum number of queued and running requests (default: {default_queue_size})')
+    parser.add_argument('--cache-size', type=int, default=1024, help='number of responses kept in the response cache (default: 1024)')
+    parser.add_argument('--instrument', action='store_true', help='record the time per stage of each request, served at GET /metrics')
+    parser.add_argument('--instrument-memory', action='store_true', help='also record the peak memory per stage')
+    args = parser.parse_args(argv)
+
+    if args.instrument or args.instrument_memory:
+        instrumentation.configure(args.instrument, args.instrument_memory)
+
+    server = MathServer((args.host, args.port), args.workers, args.timeout, args.queue, args.cache_size)
+    print(f'Serving on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
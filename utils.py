@@ -1,6 +1,7 @@
 # convert float to string without scientific notation
 # https://stackoverflow.com/questions/38847690/convert-float-to-string-without-scientific-notation-and-false-precision
 import decimal
+from currency import CurrencyRate
 
 # create a new context for this task
 decimal_ctx = decimal.Context()
@@ -263,50 +264,50 @@ for unit, val in vol.items():
 # Add currencies
 units['EUR'] = {
     'EUR': 1,
-    'USD': '*get_currency_rate(\'EUR\', \'USD\')',
-    'GBP': '*get_currency_rate(\'EUR\', \'GBP\')',
-    'CAD': '*get_currency_rate(\'EUR\', \'CAD\')',
-    'JPY': '*get_currency_rate(\'EUR\', \'JPY\')',
-    'AUD': '*get_currency_rate(\'EUR\', \'AUD\')',
-    'CHF': '*get_currency_rate(\'EUR\', \'CHF\')',
-    'NOK': '*get_currency_rate(\'EUR\', \'NOK\')',
-    'IDR': '*get_currency_rate(\'EUR\', \'IDR\')',
-    'BGN': '*get_currency_rate(\'EUR\', \'BGN\')',
-    'ILS': '*get_currency_rate(\'EUR\', \'ILS\')',
-    'DKK': '*get_currency_rate(\'EUR\', \'DKK\')',
-    'HUF': '*get_currency_rate(\'EUR\', \'HUF\')',
-    'RON': '*get_currency_rate(\'EUR\', \'RON\')',
-    'MYR': '*get_currency_rate(\'EUR\', \'MYR\')',
-    'SEK': '*get_currency_rate(\'EUR\', \'SEK\')',
-    'SGD': '*get_currency_rate(\'EUR\', \'SGD\')',
-    'HKD': '*get_currency_rate(\'EUR\', \'HKD\')',
-    'KRW': '*get_currency_rate(\'EUR\', \'KRW\')',
-    'CNY': '*get_currency_rate(\'EUR\', \'CNY\')',
-    'TRY': '*get_currency_rate(\'EUR\', \'TRY\')',
-    'HRK': '*get_currency_rate(\'EUR\', \'HRK\')',
-    'NZD': '*get_currency_rate(\'EUR\', \'NZD\')',
-    'THB': '*get_currency_rate(\'EUR\', \'THB\')',
-    'RUB': '*get_currency_rate(\'EUR\', \'RUB\')',
-    'INR': '*get_currency_rate(\'EUR\', \'INR\')',
-    'MXN': '*get_currency_rate(\'EUR\', \'MXN\')',
-    'CZK': '*get_currency_rate(\'EUR\', \'CZK\')',
-    'BRL': '*get_currency_rate(\'EUR\', \'BRL\')',
-    'PLN': '*get_currency_rate(\'EUR\', \'PLN\')',
-    'PHP': '*get_currency_rate(\'EUR\', \'PHP\')',
-    'ZAR': '*get_currency_rate(\'EUR\', \'ZAR\')'
+    'USD': CurrencyRate('EUR', 'USD'),
+    'GBP': CurrencyRate('EUR', 'GBP'),
+    'CAD': CurrencyRate('EUR', 'CAD'),
+    'JPY': CurrencyRate('EUR', 'JPY'),
+    'AUD': CurrencyRate('EUR', 'AUD'),
+    'CHF': CurrencyRate('EUR', 'CHF'),
+    'NOK': CurrencyRate('EUR', 'NOK'),
+    'IDR': CurrencyRate('EUR', 'IDR'),
+    'BGN': CurrencyRate('EUR', 'BGN'),
+    'ILS': CurrencyRate('EUR', 'ILS'),
+    'DKK': CurrencyRate('EUR', 'DKK'),
+    'HUF': CurrencyRate('EUR', 'HUF'),
+    'RON': CurrencyRate('EUR', 'RON'),
+    'MYR': CurrencyRate('EUR', 'MYR'),
+    'SEK': CurrencyRate('EUR', 'SEK'),
+    'SGD': CurrencyRate('EUR', 'SGD'),
+    'HKD': CurrencyRate('EUR', 'HKD'),
+    'KRW': CurrencyRate('EUR', 'KRW'),
+    'CNY': CurrencyRate('EUR', 'CNY'),
+    'TRY': CurrencyRate('EUR', 'TRY'),
+    'HRK': CurrencyRate('EUR', 'HRK'),
+    'NZD': CurrencyRate('EUR', 'NZD'),
+    'THB': CurrencyRate('EUR', 'THB'),
+    'RUB': CurrencyRate('EUR', 'RUB'),
+    'INR': CurrencyRate('EUR', 'INR'),
+    'MXN': CurrencyRate('EUR', 'MXN'),
+    'CZK': CurrencyRate('EUR', 'CZK'),
+    'BRL': CurrencyRate('EUR', 'BRL'),
+    'PLN': CurrencyRate('EUR', 'PLN'),
+    'PHP': CurrencyRate('EUR', 'PHP'),
+    'ZAR': CurrencyRate('EUR', 'ZAR')
 }
 curr = units['EUR']
 for unit in curr:
     if unit == 'EUR':
         continue
-    units[unit] = {'EUR': f'*get_currency_rate(\'{unit}\', \'EUR\')'}
+    units[unit] = {'EUR': CurrencyRate(unit, 'EUR')}
     for unit_2 in curr:
         if unit_2 == 'EUR':
             continue
         elif unit_2 == unit:
             units[unit][unit_2] = 1
         else:
-            units[unit][unit_2] = f'*get_currency_rate(\'{unit}\', \'{unit_2}\')'
+            units[unit][unit_2] = CurrencyRate(unit, unit_2)
 
 def is_int(num):
     try:
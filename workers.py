@@ -0,0 +1,193 @@
+from collections import deque
+from typing import Any, Callable, List, Optional, Tuple
+import itertools
+import multiprocessing as mp
+import pickle
+import queue
+import threading
+import time
+import instrumentation
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+# Default wall-clock budget per request in seconds
+default_timeout = 30
+# Default memory budget per worker process in bytes
+default_memory_limit = 4 * 2**30
+
+
+class CancelledError(Exception):
+    pass
+
+
+def limit_memory(memory_limit: int):
+    '''
+    Limits the address space of the current process, so that a runaway calculation raises MemoryError.
+    '''
+    if resource is None or not memory_limit:
+        return
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except (ValueError, OSError):
+        pass
+
+def portable_error(error: Exception) -> Exception:
+    '''
+    Gets the error if it survives being pickled to the parent process, or else the builtin exception class it derives from
+    with the name and message of the error, so that its result is not lost (e.g. for many sympy and C extension errors).
+    '''
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        base = next(cls for cls in type(error).__mro__ if cls.__module__ == 'builtins')
+        try:
+            return base(f'{type(error).__name__}: {error}')
+        except Exception:
+            return RuntimeError(f'{type(error).__name__}: {error}')
+
+def worker_main(tasks: mp.Queue, results: mp.Queue, memory_limit: int, initializer: Optional[Callable] = None):
+    '''
+    Main loop of a worker process: runs tasks until it receives None.
+    The initializer runs in a background thread, so that it does not delay the first task.
+    The instrumentation records of each task are sent along with its result.
+    '''
+    limit_memory(memory_limit)
+    if initializer:
+        threading.Thread(target=initializer, daemon=True).start()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        request_id, function, args = task
+        try:
+            with instrumentation.request(function.__name__):
+                result = function(*args)
+            results.put((request_id, True, result, instrumentation.take_request()))
+        except MemoryError:
+            results.put((request_id, False, MemoryError('Calculation exceeded the memory limit.'), []))
+        except Exception as e:
+            results.put((request_id, False, portable_error(e), instrumentation.take_request()))
+
+
+class Worker:
+    '''
+    Worker process with its own task and result queues, so that killing it cannot corrupt the queues of other workers.
+    '''
+    def __init__(self, context: mp.context.BaseContext, memory_limit: int, initializer: Optional[Callable] = None):
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(target=worker_main, args=(self.tasks, self.results, memory_limit, initializer), daemon=True)
+        self.process.start()
+        self.request_id = None
+        self.started = None
+        self.deadline = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+
+
+class WorkerPool:
+    '''
+    Pool of worker processes that run calculations with a wall-clock and memory budget per request.
+    Requests that time out or are cancelled are stopped by killing their worker, which is then replaced.
+    Results are collected by calling poll, e.g. from a Tk after() loop.
+    The optional initializer is called in each worker process when it starts, e.g. to import dependencies ahead of time.
+    '''
+    def __init__(self, size: int = 2, timeout: float = default_timeout, memory_limit: int = default_memory_limit, initializer: Optional[Callable] = None):
+        self.context = mp.get_context('spawn')
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.initializer = initializer
+        self.workers = [Worker(self.context, memory_limit, initializer) for _ in range(size)]
+        self.pending = deque()
+        self.finished = []
+        self.ids = itertools.count(1)
+
+    def submit(self, function: Callable, *args, timeout: Optional[float] = None) -> int:
+        '''
+        Queues a call of function(*args) and returns its request id.
+        The function and its arguments must be picklable, e.g. module level functions.
+        '''
+        request_id = next(self.ids)
+        self.pending.append((request_id, function, args, timeout or self.timeout))
+        self.dispatch()
+        return request_id
+
+    def cancel(self, request_id: int):
+        '''
+        Cancels a queued or running request.
+        '''
+        for request in self.pending:
+            if request[0] == request_id:
+                self.pending.remove(request)
+                self.finished.append((request_id, False, CancelledError('Calculation cancelled.')))
+                return
+        for i, worker in enumerate(self.workers):
+            if worker.request_id == request_id:
+                self.replace(i)
+                self.finished.append((request_id, False, CancelledError('Calculation cancelled.')))
+                return
+
+    def poll(self) -> List[Tuple[int, bool, Any]]:
+        '''
+        Gets the requests that finished since the last poll, as tuples of (request id, success, result or exception).
+        The instrumentation records of finished requests are merged into the statistics of this process.
+        '''
+        finished, self.finished = self.finished, []
+        for worker in self.workers:
+            try:
+                request_id, success, result, records = worker.results.get_nowait()
+            except queue.Empty:
+                continue
+            if records:
+                instrumentation.merge(records)
+            if worker.request_id == request_id:
+                worker.request_id, worker.started, worker.deadline = None, None, None
+                finished.append((request_id, success, result))
+
+        now = time.monotonic()
+        for i, worker in enumerate(self.workers):
+            if worker.request_id is not None and not worker.process.is_alive():
+                finished.append((worker.request_id, False, MemoryError('Calculation was stopped by the operating system.')))
+                self.replace(i)
+            elif worker.deadline is not None and now > worker.deadline:
+                timeout = worker.deadline - worker.started
+                finished.append((worker.request_id, False, TimeoutError(f'Calculation timed out after {timeout:g} seconds.')))
+                self.replace(i)
+
+        self.dispatch()
+        return finished
+
+    def busy(self) -> bool:
+        return bool(self.pending or self.finished or any(worker.request_id is not None for worker in self.workers))
+
+    def dispatch(self):
+        for worker in self.workers:
+            if not self.pending:
+                return
+            if worker.request_id is None:
+                request_id, function, args, timeout = self.pending.popleft()
+                worker.request_id = request_id
+                worker.started = time.monotonic()
+                worker.deadline = worker.started + timeout
+                worker.tasks.put((request_id, function, args))
+
+    def replace(self, index: int):
+        '''
+        Kills the worker at the given index and starts a new one in its place.
+        '''
+        self.workers[index].kill()
+        self.workers[index] = Worker(self.context, self.memory_limit, self.initializer)
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.tasks.put(None)
+        for worker in self.workers:
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.kill()